@@ -0,0 +1,243 @@
+# admission.py
+"""
+Admission control: per-principal rate limits and per-process concurrency caps.
+Every request belongs to a route class (ROUTE_CLASSES). Views pick one with
+@route_class; any other view is "read" or "write" by HTTP method. Each
+(class, principal) pair has a token bucket. The principal is the JWT
+username, the username being logged in for the login class, or else the
+client address (the X-Forwarded-For client behind TRUSTED_PROXY_HOPS proxies,
+see app.py). Logins also take a token from a looser per-address bucket
+(LOGIN_ADDRESS_LIMITS), so one client cannot spray usernames at the password
+hasher. Classes with a concurrency cap also hold a slot for the whole
+request, including a streamed body. Requests over a limit are answered
+immediately instead of queueing: 429 when the bucket is empty, 503 when no slot
+is free, both with Retry-After.
+
+Buckets live in process memory (LocalBuckets). Set RATE_LIMIT_REDIS_URL to
+share them between workers (RedisBuckets), or pass any object with the same
+take() method to init_app.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, Counter, namedtuple
+from flask import g, request, jsonify
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional shared backend
+    redis = None
+
+logger = logging.getLogger('attendance.admission')
+
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'on') == 'on'
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', '')
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+# Seconds a request may wait for a concurrency slot before it gets a 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '0'))
+
+RouteClass = namedtuple('RouteClass', 'rate burst concurrency')
+
+
+def _route_class(name, rate, burst, concurrency=None):
+    # RATE_LIMIT_<NAME>=<tokens per second>/<burst> and CONCURRENCY_<NAME>=<slots> override the defaults
+    rate, burst = os.getenv(f'RATE_LIMIT_{name.upper()}', f'{rate}/{burst}').split('/')
+    concurrency = os.getenv(f'CONCURRENCY_{name.upper()}', concurrency)
+    return RouteClass(float(rate), float(burst), int(concurrency) if concurrency else None)
+
+
+ROUTE_CLASSES = {
+    'login': _route_class('login', 0.2, 5),
+    'read': _route_class('read', 20, 100),
+    'write': _route_class('write', 5, 20),
+    'submit': _route_class('submit', 1, 5, concurrency=4),
+    'export': _route_class('export', 0.5, 3, concurrency=2),
+    'bulk': _route_class('bulk', 0.5, 10, concurrency=2),
+}
+
+# Logins per client address, whichever usernames they try; loose because offices share an address
+LOGIN_ADDRESS_LIMITS = _route_class('login_address', 2, 30)
+
+# Rejections per (class, reason), exported through gauges()
+REJECTED = Counter()
+_rejected_lock = threading.Lock()
+
+
+def route_class(name):
+    """Put a view in route class ``name``; None exempts it from admission control."""
+    def decorator(f):
+        f.route_class = name
+        return f
+    return decorator
+
+
+class LocalBuckets:
+    """Token buckets in process memory; least recently used keys are dropped past ``max_keys``."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token from ``key``'s bucket; returns 0 if granted, else seconds until one is due."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if tokens >= 1 else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Same algorithm as LocalBuckets.take, atomic in Redis and on the Redis clock
+TOKEN_BUCKET_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = math.min(burst, (tonumber(state[1]) or burst) + (now - (tonumber(state[2]) or now)) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker through Redis. Fails open if Redis is unreachable."""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_REDIS_URL requires the redis package')
+        self._take = redis.Redis.from_url(url, socket_timeout=0.1).register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, key, rate, burst):
+        try:
+            return float(self._take(keys=[f'ratelimit:{key}'], args=[rate, burst]))
+        except redis.RedisError:
+            logger.warning('Rate limit backend unavailable; admitting request', exc_info=True)
+            return 0.0
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests of a class in flight in this process."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Take a slot; returns the function that gives it back, or None if none is free within ``timeout``."""
+        acquired = self._slots.acquire(timeout=timeout) if timeout else self._slots.acquire(blocking=False)
+        if not acquired:
+            return None
+        with self._lock:
+            self.in_flight += 1
+        released = False
+
+        def release():
+            # Response close callbacks can run more than once
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                self.in_flight -= 1
+            self._slots.release()
+        return release
+
+
+LIMITERS = {name: ConcurrencyLimiter(c.concurrency) for name, c in ROUTE_CLASSES.items() if c.concurrency}
+
+
+def principal(name):
+    claims = g.get('claims')
+    if claims:
+        return f'user:{claims.get("username")}'
+    if name == 'login':
+        # Many approvers log in from one office address; limit per account instead
+        username = (request.get_json(silent=True) or {}).get('username')
+        if isinstance(username, str):
+            return f'login:{username}'
+    return f'addr:{request.remote_addr}'
+
+
+def buckets(name):
+    """(key, limits) of every bucket a request of class ``name`` takes a token from, in order."""
+    who = principal(name)
+    account = (f'{name}:{who}', ROUTE_CLASSES[name])
+    if who.startswith('login:'):
+        # Checked first, so a sprayed username is refused before it gets a bucket of its own
+        return [(f'login_address:addr:{request.remote_addr}', LOGIN_ADDRESS_LIMITS), account]
+    return [account]
+
+
+def rejected(name, reason, status, message, retry_after):
+    with _rejected_lock:
+        REJECTED[name, reason] += 1
+    headers = {'Retry-After': str(max(1, math.ceil(retry_after)))}
+    return jsonify({'error': message}), status, headers
+
+
+def gauges():
+    """Rejection counts and in-flight requests, for instrumentation.init_app."""
+    with _rejected_lock:
+        values = {f'admission_rejected_{reason}_{name}': count for (name, reason), count in REJECTED.items()}
+    values.update({f'admission_in_flight_{name}': limiter.in_flight for name, limiter in LIMITERS.items()})
+    return values
+
+
+def init_app(app, backend=None):
+    """Register the admission hooks on ``app``.
+
+    Must run after the hook that loads JWT claims onto ``g``. ``backend``
+    overrides the bucket store chosen from RATE_LIMIT_REDIS_URL.
+    """
+    if backend is None:
+        backend = RedisBuckets(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else LocalBuckets()
+
+    @app.before_request
+    def admit():
+        view = app.view_functions.get(request.endpoint)
+        if not ADMISSION_CONTROL or view is None or request.method == 'OPTIONS':
+            return None
+        name = getattr(view, 'route_class', 'read' if request.method in ('GET', 'HEAD') else 'write')
+        if name is None:
+            return None
+        for key, limits in buckets(name):
+            wait = backend.take(key, limits.rate, limits.burst)
+            if wait > 0:
+                return rejected(name, 'rate', 429, 'Too many requests, please slow down', wait)
+        limiter = LIMITERS.get(name)
+        if limiter is not None:
+            release = limiter.acquire(ADMISSION_QUEUE_TIMEOUT)
+            if release is None:
+                return rejected(name, 'busy', 503, 'Server busy, please retry', 1)
+            g.release_admission_slot = release
+        return None
+
+    @app.after_request
+    def hold_slot_until_closed(response):
+        release = g.pop('release_admission_slot', None)
+        if release is not None and response.is_streamed:
+            # Streamed bodies do their work while the server sends them
+            response.call_on_close(release)
+        elif release is not None:
+            release()
+        return response
+
+    @app.teardown_request
+    def release_slot(exception=None):
+        # Only set here when after_request never ran
+        release = g.pop('release_admission_slot', None)
+        if release is not None:
+            release()
@@ -1,22 +1,59 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import jwt
 import datetime
+import time
+import threading
+from collections import OrderedDict, namedtuple
 from functools import wraps
-from models import Vendor, Location, Approver, BillingCycleRule, Designation
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from models import (Vendor, Location, Approver, BillingCycleRule, Designation, Employee, MonthlyAttendance, AttendanceSummary,
+                    ApproverClosure, AttendanceTombstone, CacheGeneration)
+from sqlalchemy import func, text, select, update, tuple_, union
 import os
+import json
+import math
+import base64
+import hashlib
+import csv
+import io
+import itertools
+import logging
+import tempfile
 from dotenv import load_dotenv
-import bcrypt
+from config import Config
+from billing_calendar import ineligibility_reasons
+from importer import TABLES as IMPORT_TABLES, run_import
+from jobs import job_handler, enqueue, job_status
+from batch import BatchError, apply_batch
+from attendance_history import archived_years, parquet_schema, read_archive
+from attendance_summary import SUMMARY_KEY, SUMMARY_TOTALS, refresh_attendance_summary, employee_groups
+from employee_directory import EmployeeDirectory, DIRECTORY_REFRESH_SECONDS
+from changes import next_change_seq, current_change_seq, record_tombstones, tombstone_attendance_of, FILTERED_EMPLOYEE_FIELDS
+from approver_tree import add_approver_node, move_approver_node, remove_approver_node, rebuild_approver_closure
+from hashing import HasherBusy, hash_password, identify, verify_password_bounded
+from db import engine, replicas, Session, pool_stats
+from json_provider import FastJSONProvider
+from admission import route_class
+import admission
+import instrumentation
+import response_compression
 
 
+logger = logging.getLogger('attendance.app')
+
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": ["http://localhost:5173"]}}, supports_credentials=True, allow_headers=["Content-Type", "Authorization"])
+app.config.from_object(Config)
+if Config.TRUSTED_PROXY_HOPS:
+    # request.remote_addr is the client, not the proxy, so per-address rate limits apply per client
+    hops = Config.TRUSTED_PROXY_HOPS
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+app.json = FastJSONProvider(app)
+response_compression.init_app(app)
+CORS(app, resources={r"/*": {"origins": ["http://localhost:5173"]}}, supports_credentials=True, allow_headers=["Content-Type", "Authorization"], expose_headers=["X-Next-Cursor"])
 app.config['SECRET_KEY'] = 'your-secret-key'  # Change this in production
 
 # Dummy admin user for demonstration
-# Precomputed bcrypt hash for 'admin' (generated with bcrypt.hashpw(b'admin', bcrypt.gensalt()))
 ADMIN_USER = {
     'username': 'admin',
     'password': 'admin',
@@ -25,19 +62,176 @@ ADMIN_USER = {
 
 load_dotenv()
 
-# Configure your database URI
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///attendance.db')  # Default fallback
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
+# Credentials and tokens must never be stored by browsers or proxies
+NO_STORE = {'Cache-Control': 'no-store'}
+
+# Database URI and pool settings come from config.Config; see db.py
+@app.teardown_appcontext
+def remove_session(exception=None):
+    # Return the request's connection to the pool even on error paths
+    Session.remove()
+
+# Set on responses to successful writes; while present, the client's reads skip the replicas
+# and the employee directory, both of which can lag the write
+PRIMARY_PIN_COOKIE = 'read_primary'
+PRIMARY_PIN_SECONDS = max(Config.REPLICA_STICKY_SECONDS, math.ceil(DIRECTORY_REFRESH_SECONDS))
+READ_METHODS = ('GET', 'HEAD')
+
+@app.before_request
+def route_reads():
+    """Send this request's reads to a replica if it is a read and the client has not just written."""
+    Session().info['read_only'] = request.method in READ_METHODS and PRIMARY_PIN_COOKIE not in request.cookies
+
+@app.after_request
+def pin_writer_to_primary(response):
+    # Read-your-writes: the next PRIMARY_PIN_SECONDS of reads see the primary database
+    if request.method not in READ_METHODS + ('OPTIONS',) and response.status_code < 400:
+        response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=PRIMARY_PIN_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+def read_from_primary():
+    Session().info['read_only'] = False
+
+# Rows fetched per round-trip (and per emitted chunk) by streamed list endpoints
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '1000'))
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def stream_json_array(session, rows, serialize, prefix='[', suffix=']\n'):
+    """Stream ``rows`` as a JSON array, one chunk per STREAM_CHUNK_SIZE rows.
+
+    ``prefix`` and ``suffix`` wrap the array elements, so the array can be
+    embedded in an object. The session is closed once the generator is
+    exhausted or the client goes away.
+    """
+    def generate():
+        try:
+            yield prefix
+            first = True
+            for chunk in batches(map(serialize, rows), STREAM_CHUNK_SIZE):
+                # One encoder call per chunk; strip the list's brackets to splice chunks together
+                yield ('' if first else ',') + app.json.dumps(chunk, sort_keys=False)[1:-1]
+                first = False
+            yield suffix
+        finally:
+            session.close()
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# Upper bound for the ``limit`` query parameter on list endpoints
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '1000'))
+
+# Query parameters consumed by list_response itself, never treated as filters
+LIST_PARAMS = {'fields', 'limit', 'cursor', 'format'}
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        raise ValueError('cursor is invalid')
+
+def coerce_arg(column, raw):
+    """Convert a query-string value to the Python type of ``column``."""
+    python_type = column.type.python_type
+    if python_type is bool:
+        if raw not in ('true', 'false'):
+            raise ValueError(f'{column.key} must be true or false')
+        return raw == 'true'
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(raw)
+    return python_type(raw)
+
+def keyset_query(query, columns, fields, key):
+    """Project ``query`` onto ``fields`` (plus the ``key`` column) ordered by ``key``."""
+    selected = fields if key in fields else fields + [key]
+    return query.with_entities(*[columns[f].label(f) for f in selected]).order_by(columns[key])
+
+def list_response(session, query, columns, key, filterable=()):
+    """Serve ``query`` as a keyset-paginated, column-projected JSON array.
+
+    ``columns`` maps each output field to its column expression and ``key`` names
+    the unique field the listing is ordered and paginated on. Supported query
+    parameters are ``fields`` (comma-separated projection), ``limit`` (capped at
+    MAX_PAGE_SIZE), ``cursor`` (the ``X-Next-Cursor`` value of the previous page),
+    ``format=columnar`` (a ``{"columns": [...], "rows": [[...]]}`` body without
+    repeated keys) and equality filters on the ``filterable`` fields. Without
+    ``limit`` the full listing is streamed.
+    """
+    try:
+        fields, columnar, limit = list_params(columns)
+        for name in filterable:
+            if name in request.args and name not in LIST_PARAMS:
+                query = query.filter(columns[name] == coerce_arg(columns[name], request.args[name]))
+        key_column = columns[key]
+        if request.args.get('cursor'):
+            query = query.filter(key_column > decode_cursor(request.args['cursor']))
+    except ValueError as e:
+        session.close()
+        return jsonify({'error': str(e)}), 400
+
+    query = keyset_query(query, columns, fields, key)
+    rows = query.yield_per(STREAM_CHUNK_SIZE) if limit is None else query.limit(limit + 1).all()
+    return list_page(session, rows, fields, key, columnar, limit)
+
+def list_params(columns):
+    """Parse list_response's ``fields``, ``format`` and ``limit`` parameters; raises ValueError."""
+    fields = list(columns)
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    columnar = request.args.get('format', 'objects') == 'columnar'
+    if request.args.get('format', 'objects') not in ('objects', 'columnar'):
+        raise ValueError('format must be objects or columnar')
+    limit = request.args.get('limit')
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        limit = min(limit, MAX_PAGE_SIZE)
+    return fields, columnar, limit
+
+def list_page(session, rows, fields, key, columnar, limit):
+    """Serialize ``rows`` (``fields`` then ``key``, at most limit + 1 of them) as list_response does."""
+    if columnar:
+        # Rows carry ``fields`` first, then the key if it was not requested (see keyset_query)
+        width = len(fields)
+        serialize = lambda row: row[:width]
+        envelope = {'prefix': '{"columns":' + app.json.dumps(fields) + ',"rows":[', 'suffix': ']}\n'}
+    else:
+        serialize = lambda row: {f: getattr(row, f) for f in fields}
+        envelope = {}
+
+    if limit is None:
+        return stream_json_array(session, rows, serialize, **envelope)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key))
+    response = stream_json_array(session, rows, serialize, **envelope)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/login', methods=['POST'])
+@route_class('login')
 def login():
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
+    if not username or not password:
+        return jsonify({'error': 'username and password are required'}), 400
     # Check admin
     if username == ADMIN_USER['username']:
-        # Use bcrypt to check the password
         if password == ADMIN_USER['password']:
             payload = {
                 'username': username,
@@ -45,167 +239,441 @@ def login():
                 'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=2)
             }
             token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
-            return jsonify({'token': token, 'is_admin': True}), 200
+            return jsonify({'token': token, 'is_admin': True}), 200, NO_STORE
     # Check Approver (non-admin) by emp_id
     session = Session()
     approver = session.query(Approver).filter_by(emp_id=username).first()
-    if approver and approver.password_hash:
-        # Use bcrypt to check the password for approver
-        if bcrypt.checkpw(password.encode(), approver.password_hash.encode()):
-            payload = {
-                'username': approver.emp_id,
-                'is_admin': False,
-                'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=2)
-            }
-            token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
-            session.close()
-            return jsonify({'token': token, 'is_admin': False}), 200
+    try:
+        # Unknown approvers still pay for one verification so response time doesn't reveal them
+        ok, new_hash = verify_password_bounded(approver.password_hash if approver else None, password)
+    except (HasherBusy, TimeoutError):
+        session.close()
+        return jsonify({'error': 'Too many logins in progress, please retry'}), 503, {'Retry-After': '1'}
+    if ok:
+        if new_hash:
+            # Transparently upgrade hashes made with an older scheme or cost
+            approver.password_hash = new_hash
+            session.commit()
+        payload = {
+            'username': approver.emp_id,
+            'is_admin': False,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=2)
+        }
+        token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+        session.close()
+        return jsonify({'token': token, 'is_admin': False}), 200, NO_STORE
     session.close()
-    return jsonify({'error': 'Invalid credentials'}), 401
+    return jsonify({'error': 'Invalid credentials'}), 401, NO_STORE
+
+def password_hash_from(data):
+    """Hash ``password`` from a request body, or accept an already-hashed ``password_hash``.
+
+    Returns None when neither is present and raises ValueError for a
+    ``password_hash`` that is not a bcrypt or argon2 hash.
+    """
+    if data.get('password'):
+        return hash_password(data['password'])
+    if data.get('password_hash'):
+        if identify(data['password_hash']) is None:
+            raise ValueError('password_hash must be a bcrypt or argon2 hash; send password instead')
+        return data['password_hash']
+    return None
+
+class TokenCache:
+    """Small LRU of verified JWT claims, keyed by the raw token.
+
+    Entries expire after ``ttl`` seconds or at the token's own ``exp``, whichever
+    comes first, so a cached token is never honoured past its expiry.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            claims, expires = entry
+            if time.time() >= expires:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token, claims):
+        expires = min(time.time() + self.ttl, claims.get('exp', float('inf')))
+        with self._lock:
+            self._entries[token] = (claims, expires)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+token_cache = TokenCache(
+    maxsize=int(os.getenv('JWT_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('JWT_CACHE_TTL', '60'))
+)
+
+@app.before_request
+def load_claims():
+    """Verify the bearer token once per request and keep its claims on ``g``."""
+    g.claims = None
+    g.auth_error = None
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return
+    token = auth_header.split(' ')[1]
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            g.auth_error = 'Token expired!'
+            return
+        except jwt.InvalidTokenError:
+            g.auth_error = 'Token is invalid!'
+            return
+        token_cache.put(token, claims)
+    g.claims = claims
+
+def pool_gauges():
+    return {f'db_pool_{name}': value for name, value in pool_stats(engine).items() if name != 'pool_class'}
+
+# Registered after load_claims so ?_profile=1 can check for an admin token
+instrumentation.init_app(app, gauges=lambda: {**pool_gauges(), **admission.gauges()})
+# After load_claims too: rate limits are keyed by the token's username
+admission.init_app(app)
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        if not token:
-            return jsonify({'error': 'Token is missing!'}), 401
-        try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            # Only check token validity, not admin status
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token expired!'}), 401
-        except Exception:
-            print("Token decode error:", Exception)
-            return jsonify({'error': 'Token is invalid!'}), 401
+        if g.claims is None:
+            return jsonify({'error': g.auth_error or 'Token is missing!'}), 401
         return f(*args, **kwargs)
     return decorated
 
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        if not token:
-            return jsonify({'error': 'Token is missing!'}), 401
-        try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            if not data.get('is_admin'):
-                return jsonify({'error': 'Admin privileges required!'}), 403
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token expired!'}), 401
-        except Exception:
-            return jsonify({'error': 'Token is invalid!'}), 401
+        if g.claims is None:
+            return jsonify({'error': g.auth_error or 'Token is missing!'}), 401
+        if not g.claims.get('is_admin'):
+            return jsonify({'error': 'Admin privileges required!'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def primary_reads(f):
+    """Serve a GET handler from the primary, for state that changes outside requests (job progress)."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        read_from_primary()
         return f(*args, **kwargs)
     return decorated
 
+class MasterDataCache:
+    """Memoized JSON bodies for slow-changing master-data listings.
+
+    Each table has a version counter that mutation handlers bump; bodies are
+    keyed by (table, version, query string) and also expire after ``ttl``
+    seconds, which bounds staleness when another worker process did the write.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._versions = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, table):
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def bump(self, table):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[3] >= self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, etag, headers):
+        with self._lock:
+            self._entries[key] = entry = (body, etag, headers, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return entry
+
+# Tables whose listings go through cached_listing
+MASTER_TABLES = ('vendors', 'locations', 'designations', 'billing-cycle-rules')
+
+master_cache = MasterDataCache(
+    maxsize=int(os.getenv('MASTER_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('MASTER_CACHE_TTL', '60'))
+)
+
+def cached_listing(table):
+    """Serve a master-data GET from master_cache, with ETag / If-None-Match support."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = (table, master_cache.version(table), request.query_string)
+            entry = master_cache.get(key)
+            if entry is None:
+                # A lagging replica would cache pre-bump rows under the new version
+                read_from_primary()
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()[:20]
+                headers = {k: v for k, v in response.headers.items() if k == 'X-Next-Cursor'}
+                entry = master_cache.put(key, body, etag, headers)
+            body, etag, headers, _ = entry
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            response.headers.update(headers)
+            # Let browsers keep the body but revalidate it on every dropdown load
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
+
+# Employees and master keys for hot-path lookups; see employee_directory.py
+employee_directory = EmployeeDirectory(engine)
+
+cache_generation = CacheGeneration.__table__
+# Seconds between reads of cache_generation: how long caches may lag master data a job worker changed
+CACHE_GENERATION_CHECK_SECONDS = float(os.getenv('CACHE_GENERATION_CHECK_SECONDS', '5'))
+
+def bump_cache_generation(connection):
+    """Have every web process drop its master-data cache and refresh its employee directory.
+
+    For writers outside the web processes, such as import jobs, whose own
+    caches serve no requests.
+    """
+    connection.execute(update(cache_generation).where(cache_generation.c.id == 1)
+                       .values(value=cache_generation.c.value + 1))
+
+class GenerationWatch:
+    """Expires this process's master_cache and employee_directory when cache_generation moves.
+
+    Requests start a background read at most every ``interval`` seconds, so
+    they never wait on it.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._seen = None
+        self._checked_at = time.monotonic()
+        self._checking = threading.Lock()
+
+    def poll(self):
+        """Read cache_generation now; expire the caches if it moved since the previous read."""
+        with engine.connect() as connection:
+            generation = connection.execute(
+                select(cache_generation.c.value).where(cache_generation.c.id == 1)
+            ).scalar()
+        if self._seen is not None and generation != self._seen:
+            for table in MASTER_TABLES:
+                master_cache.bump(table)
+            employee_directory.expire()
+        self._seen = generation
+        self._checked_at = time.monotonic()
+
+    def check(self):
+        if time.monotonic() - self._checked_at < self.interval or not self._checking.acquire(blocking=False):
+            return
+        threading.Thread(target=self._poll_and_release, daemon=True).start()
+
+    def _poll_and_release(self):
+        try:
+            self.poll()
+        except Exception:
+            logger.warning('Could not read cache_generation', exc_info=True)
+            self._checked_at = time.monotonic()
+        finally:
+            self._checking.release()
+
+generation_watch = GenerationWatch(CACHE_GENERATION_CHECK_SECONDS)
+
+@app.before_request
+def check_cache_generation():
+    generation_watch.check()
+
+def invalidates(*tables):
+    """Bump the master_cache version of ``tables`` after a mutation handler runs.
+
+    List every table whose listing shows the changed rows, e.g. vendor renames
+    also change the designation and billing-cycle-rule listings.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                return f(*args, **kwargs)
+            finally:
+                for table in tables:
+                    master_cache.bump(table)
+                employee_directory.expire()
+        return decorated
+    return decorator
+
 @app.route('/api/vendors', methods=['GET'])
 @token_required
+@cached_listing('vendors')
 def get_vendors():
     session = Session()
-    vendors = session.query(Vendor).all()
-    result = [{'vendor_name': v.vendor_name} for v in vendors]
-    session.close()
-    return jsonify(result)
+    columns = {'vendor_name': Vendor.vendor_name}
+    return list_response(session, session.query(Vendor), columns, key='vendor_name')
+
+# Single joined, column-only projection: no per-row lazy loads, no ORM hydration
+EMPLOYEE_COLUMNS = {
+    'emp_id': Employee.emp_id,
+    'name': Employee.name,
+    'gender': Employee.gender,
+    'state': Employee.state,
+    'location': Employee.location,
+    'vendor_name': Employee.vendor_name,
+    'approver_emp_id': Employee.approver_emp_id,
+    'billing_rule_id': Employee.billing_rule_id,
+    'billing_rule_start_day': BillingCycleRule.start_day,
+    'doj': Employee.doj,
+    'designation_id': Employee.designation_id,
+    'designation': Designation.designation,
+    'dob': Employee.dob,
+    'resignation_date': Employee.resignation_date,
+    'resigned': Employee.resigned
+}
+
+EMPLOYEE_FILTERS = ['location', 'vendor_name', 'approver_emp_id', 'billing_rule_id', 'designation_id', 'resigned']
+
+def employees_query(session):
+    query = session.query(Employee)
+    query = query.outerjoin(BillingCycleRule, Employee.billing_rule_id == BillingCycleRule.rule_id)
+    return query.outerjoin(Designation, Employee.designation_id == Designation.designation_id)
 
 @app.route('/api/employees', methods=['GET'])
 @token_required
 def get_employees():
-    token = None
-    if 'Authorization' in request.headers:
-        auth_header = request.headers['Authorization']
-        if auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
+    emp_id = g.claims.get('username')  # This is the approver's emp_id
+    is_admin = g.claims.get('is_admin')
 
-    try:
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        emp_id = data.get('username')  # This is the approver's emp_id
-        print("Decoded token data:", data)
-        is_admin = data.get('is_admin')
-    except jwt.ExpiredSignatureError:
-        return jsonify({'error': 'Token expired!'}), 401
-    except Exception as e:
-        return jsonify({'error': 'Token is invalid!', 'detail': str(e)}), 401
+    # Clients that just wrote read the database, and so does everyone while the directory is
+    # older than the pin cookie lasts (its refresh is running)
+    if PRIMARY_PIN_COOKIE not in request.cookies and employee_directory.is_current():
+        return directory_employees(None if is_admin else emp_id)
 
     session = Session()
-    from models import Employee
+    query = employees_query(session)
 
-    if is_admin:
-        # Admin sees all employees
-        employees = session.query(Employee).all()
-    else:
+    if not is_admin:
         # Approver sees only employees they manage
-        employees = session.query(Employee).filter_by(approver_emp_id=emp_id).all()
-        print(employees)
-
-    result = [
-        {
-            'emp_id': e.emp_id,
-            'name': e.name,
-            'gender': e.gender,
-            'state': e.state,
-            'location': e.location,
-            'vendor_name': e.vendor_name,
-            'approver_emp_id': e.approver_emp_id,
-            'billing_rule_id': e.billing_rule_id,
-            'billing_rule_start_day': e.billing_rule.start_day if e.billing_rule else None,
-            'doj': e.doj.isoformat() if e.doj else None,
-            'designation_id': e.designation_id,
-            'designation': session.query(Designation.designation).filter_by(designation_id=e.designation_id).all()[0].designation if e.designation_id else None,
-            'dob': e.dob.isoformat() if e.dob else None,
-            'resignation_date': e.resignation_date.isoformat() if e.resignation_date else None,
-            'resigned': e.resigned
-        } for e in employees
-    ]
-    print("Employees fetched:", result)
-    session.close()
-    return jsonify(result)
+        query = query.filter(Employee.approver_emp_id == emp_id)
+
+    return list_response(session, query, EMPLOYEE_COLUMNS, key='emp_id', filterable=EMPLOYEE_FILTERS)
+
+def directory_employees(scope):
+    """GET /api/employees served from employee_directory; ``scope`` limits it to one approver's employees."""
+    try:
+        fields, columnar, limit = list_params(EMPLOYEE_COLUMNS)
+        filters = {
+            name: coerce_arg(EMPLOYEE_COLUMNS[name], request.args[name])
+            for name in EMPLOYEE_FILTERS if name in request.args
+        }
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if scope is not None and filters.get('approver_emp_id', scope) != scope:
+        ids = []
+    else:
+        approver_emp_id = scope if scope is not None else filters.get('approver_emp_id')
+        ids = employee_directory.emp_ids(approver_emp_id=approver_emp_id, vendor_name=filters.get('vendor_name'),
+                                         after=after)
+    selected = fields if 'emp_id' in fields else fields + ['emp_id']
+    Row = namedtuple('Row', selected)
+    derived = {'billing_rule_start_day': employee_directory.start_day, 'designation': employee_directory.designation}
+    def rows():
+        for record in employee_directory.records(ids):
+            if all(getattr(record, name) == value for name, value in filters.items()):
+                yield Row(*(derived[f](record) if f in derived else getattr(record, f) for f in selected))
+    page = rows() if limit is None else list(itertools.islice(rows(), limit + 1))
+    return list_page(Session(), page, fields, 'emp_id', columnar, limit)
+
 
+def org_scope(manager_emp_id):
+    """403 response unless the caller is an admin or ``manager_emp_id`` is in their own org, else None."""
+    if g.claims.get('is_admin'):
+        return None
+    session = Session()
+    allowed = session.query(ApproverClosure).filter_by(
+        ancestor_emp_id=g.claims.get('username'), descendant_emp_id=manager_emp_id
+    ).first() is not None
+    return None if allowed else (jsonify({'error': 'Not in your reporting line'}), 403)
+
+def under_manager(column, manager_emp_id):
+    """Join condition restricting an approver column to everyone in ``manager_emp_id``'s org."""
+    return (ApproverClosure.descendant_emp_id == column) & (ApproverClosure.ancestor_emp_id == manager_emp_id)
+
+@app.route('/api/approvers/<manager_emp_id>/org/employees', methods=['GET'])
+@token_required
+def get_org_employees(manager_emp_id):
+    """Employees of every approver under ``manager_emp_id`` (the manager included), at any depth."""
+    denied = org_scope(manager_emp_id)
+    if denied:
+        return denied
+    session = Session()
+    query = employees_query(session).join(ApproverClosure, under_manager(Employee.approver_emp_id, manager_emp_id))
+    return list_response(session, query, EMPLOYEE_COLUMNS, key='emp_id', filterable=EMPLOYEE_FILTERS)
 
 @app.route('/api/locations', methods=['GET'])
 @token_required
+@cached_listing('locations')
 def get_locations():
     session = Session()
-    locations = session.query(Location).all()
-    result = [{'location': l.location, 'state': l.state} for l in locations]
-    session.close()
-    return jsonify(result)
+    columns = {'location': Location.location, 'state': Location.state}
+    return list_response(session, session.query(Location), columns, key='location', filterable=['state'])
 
 @app.route('/api/approvers', methods=['GET'])
 @token_required
 def get_approvers():
     session = Session()
-    approvers = session.query(Approver).all()
-    result = [
-        {
-            'emp_id': a.emp_id,
-            'name': a.name,
-            'email': a.email,
-            'manager_emp_id': a.manager_emp_id,
-            'manager_name': a.manager_name,
-            'manager_email': a.manager_email
-        } for a in approvers
-    ]
-    session.close()
-    return jsonify(result)
+    columns = {
+        'emp_id': Approver.emp_id,
+        'name': Approver.name,
+        'email': Approver.email,
+        'manager_emp_id': Approver.manager_emp_id,
+        'manager_name': Approver.manager_name,
+        'manager_email': Approver.manager_email
+    }
+    return list_response(session, session.query(Approver), columns, key='emp_id', filterable=['manager_emp_id'])
 
 @app.route('/api/billing-cycle-rules', methods=['GET'])
 @token_required
+@cached_listing('billing-cycle-rules')
 def get_billing_cycle_rules():
     session = Session()
-    rules = session.query(BillingCycleRule).all()
-    result = [{'rule_id': r.rule_id, 'start_day': r.start_day, 'vendor_name': r.vendor_name} for r in rules]
-    session.close()
-    return jsonify(result)
+    columns = {
+        'rule_id': BillingCycleRule.rule_id,
+        'start_day': BillingCycleRule.start_day,
+        'vendor_name': BillingCycleRule.vendor_name
+    }
+    return list_response(session, session.query(BillingCycleRule), columns, key='rule_id', filterable=['vendor_name'])
 
 @app.route('/api/vendors', methods=['POST'])
 @admin_required
+@invalidates('vendors')
 def add_vendor():
     data = request.get_json()
     vendor_name = data.get('vendor_name')
@@ -220,6 +688,7 @@ def add_vendor():
 
 @app.route('/api/locations', methods=['POST'])
 @admin_required
+@invalidates('locations')
 def add_location():
     data = request.get_json()
     location = data.get('location')
@@ -243,9 +712,12 @@ def add_approver():
     manager_emp_id = data.get('manager_emp_id')
     manager_name = data.get('manager_name')
     manager_email = data.get('manager_email')
-    password_hash = data.get('password_hash')
+    try:
+        password_hash = password_hash_from(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if not emp_id or not name or not email or not password_hash:
-        return jsonify({'error': 'emp_id, name, email, and password_hash are required'}), 400
+        return jsonify({'error': 'emp_id, name, email, and password are required'}), 400
     session = Session()
     approver = Approver(
         emp_id=emp_id,
@@ -257,12 +729,19 @@ def add_approver():
         password_hash=password_hash
     )
     session.add(approver)
+    try:
+        add_approver_node(session, emp_id, manager_emp_id)
+    except ValueError as e:
+        session.rollback()
+        session.close()
+        return jsonify({'error': str(e)}), 400
     session.commit()
     session.close()
     return jsonify({'message': 'Approver added successfully'}), 201
 
 @app.route('/api/billing-cycle-rules', methods=['POST'])
 @admin_required
+@invalidates('billing-cycle-rules')
 def add_billing_cycle_rule():
     data = request.get_json()
     rule_id = data.get('rule_id')
@@ -285,6 +764,11 @@ def add_employee():
     for field in required_fields:
         if not data.get(field):
             return jsonify({'error': f'{field} is required'}), 400
+    if employee_directory.get(data['emp_id']) is not None:
+        return jsonify({'error': 'Employee already exists'}), 409
+    unknown = employee_directory.missing_references(data)
+    if unknown:
+        return jsonify({'error': f'Unknown {", ".join(unknown)}'}), 400
     session = Session()
     from models import Employee
     employee = Employee(
@@ -302,13 +786,17 @@ def add_employee():
         resignation_date=data.get('resignation_date'),
         resigned=data.get('resigned', False)
     )
+    # Lets other processes' employee directories pick the new row up
+    employee.change_seq = next_change_seq(session)
     session.add(employee)
     session.commit()
     session.close()
+    employee_directory.refresh_employees([data['emp_id']])
     return jsonify({'message': 'Employee added successfully'}), 201
 
 @app.route('/api/vendors/<vendor_name>', methods=['PUT'])
 @admin_required
+@invalidates('vendors', 'designations', 'billing-cycle-rules')
 def update_vendor(vendor_name):
     data = request.get_json()
     session = Session()
@@ -323,6 +811,7 @@ def update_vendor(vendor_name):
 
 @app.route('/api/vendors/<vendor_name>', methods=['DELETE'])
 @admin_required
+@invalidates('vendors', 'designations', 'billing-cycle-rules')
 def delete_vendor(vendor_name):
     session = Session()
     vendor = session.query(Vendor).filter_by(vendor_name=vendor_name).first()
@@ -336,6 +825,7 @@ def delete_vendor(vendor_name):
 
 @app.route('/api/locations/<location>', methods=['PUT'])
 @admin_required
+@invalidates('locations')
 def update_location(location):
     data = request.get_json()
     session = Session()
@@ -351,6 +841,7 @@ def update_location(location):
 
 @app.route('/api/locations/<location>', methods=['DELETE'])
 @admin_required
+@invalidates('locations')
 def delete_location(location):
     session = Session()
     loc = session.query(Location).filter_by(location=location).first()
@@ -373,11 +864,24 @@ def update_approver(emp_id):
         return jsonify({'error': 'Approver not found'}), 404
     approver.name = data.get('name', approver.name)
     approver.email = data.get('email', approver.email)
-    approver.manager_emp_id = data.get('manager_emp_id', approver.manager_emp_id)
+    manager_emp_id = data.get('manager_emp_id', approver.manager_emp_id)
+    if manager_emp_id != approver.manager_emp_id:
+        try:
+            move_approver_node(session, emp_id, manager_emp_id)
+        except ValueError as e:
+            session.rollback()
+            session.close()
+            return jsonify({'error': str(e)}), 400
+        approver.manager_emp_id = manager_emp_id
     approver.manager_name = data.get('manager_name', approver.manager_name)
     approver.manager_email = data.get('manager_email', approver.manager_email)
-    if 'password_hash' in data and data['password_hash']:
-        approver.password_hash = data['password_hash']
+    try:
+        password_hash = password_hash_from(data)
+    except ValueError as e:
+        session.close()
+        return jsonify({'error': str(e)}), 400
+    if password_hash:
+        approver.password_hash = password_hash
     session.commit()
     session.close()
     return jsonify({'message': 'Approver updated successfully'})
@@ -391,12 +895,15 @@ def delete_approver(emp_id):
         session.close()
         return jsonify({'error': 'Approver not found'}), 404
     session.delete(approver)
+    remove_approver_node(session, emp_id)
     session.commit()
     session.close()
+    employee_directory.expire()
     return jsonify({'message': 'Approver deleted successfully'})
 
 @app.route('/api/billing-cycle-rules/<rule_id>', methods=['PUT'])
 @admin_required
+@invalidates('billing-cycle-rules')
 def update_billing_cycle_rule(rule_id):
     data = request.get_json()
     session = Session()
@@ -412,6 +919,7 @@ def update_billing_cycle_rule(rule_id):
 
 @app.route('/api/billing-cycle-rules/<rule_id>', methods=['DELETE'])
 @admin_required
+@invalidates('billing-cycle-rules')
 def delete_billing_cycle_rule(rule_id):
     session = Session()
     rule = session.query(BillingCycleRule).filter_by(rule_id=rule_id).first()
@@ -433,6 +941,11 @@ def update_employee(emp_id):
     if not employee:
         session.close()
         return jsonify({'error': 'Employee not found'}), 404
+    # The employee's attendance totals move between vendor/designation groups
+    regrouped = 'vendor_name' in data or 'designation_id' in data
+    # ... and its rows may leave listings filtered on these columns
+    refiltered = any(field in data and data[field] != getattr(employee, field) for field in FILTERED_EMPLOYEE_FIELDS)
+    groups = employee_groups(session, [emp_id]) if regrouped else set()
     employee.name = data.get('name', employee.name)
     employee.gender = data.get('gender', employee.gender)
     employee.state = data.get('state', employee.state)
@@ -445,8 +958,17 @@ def update_employee(emp_id):
     employee.doj = data.get('doj', employee.doj)
     employee.resignation_date = data.get('resignation_date', employee.resignation_date)
     employee.resigned = data.get('resigned', employee.resigned)
+    # Employee fields appear in attendance listings, so delta sync must resend their rows
+    employee.change_seq = next_change_seq(session)
+    if refiltered:
+        # Filtered delta-sync clients drop the rows, then get them back if they still match
+        tombstone_attendance_of(session, [emp_id], employee.change_seq)
+    if regrouped:
+        session.flush()
+        refresh_attendance_summary(session, groups | employee_groups(session, [emp_id]))
     session.commit()
     session.close()
+    employee_directory.refresh_employees([emp_id])
     return jsonify({'message': 'Employee updated successfully'})
 
 @app.route('/api/employees/<emp_id>', methods=['DELETE'])
@@ -458,32 +980,57 @@ def delete_employee(emp_id):
     if not employee:
         session.close()
         return jsonify({'error': 'Employee not found'}), 404
+    # The employee's attendance rows drop out of the joined listings
+    tombstone_attendance_of(session, [emp_id], next_change_seq(session))
     session.delete(employee)
     session.commit()
     session.close()
+    employee_directory.refresh_employees([emp_id])
     return jsonify({'message': 'Employee deleted successfully'})
 
+@app.route('/api/batch', methods=['POST'])
+@route_class('bulk')
+@admin_required
+def apply_batch_operations():
+    """Apply an ordered list of master-data mutations in one transaction.
+
+    Body: ``{"operations": [{"op": "create" | "update" | "delete", "table": <import
+    table name>, "key": ... or "keys": [...], "data": {...}}, ...]}``. Either
+    every operation is applied and the per-operation results are returned, or
+    none is and the response names the failing operation.
+    """
+    operations = (request.get_json(silent=True) or {}).get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    session = Session()
+    try:
+        results, tables = apply_batch(session, operations)
+        session.commit()
+    except BatchError as e:
+        session.rollback()
+        return jsonify({'error': e.message, 'index': e.index}), e.status
+    finally:
+        session.close()
+    for table in tables & set(MASTER_TABLES):
+        master_cache.bump(table)
+    employee_directory.expire()
+    return jsonify({'results': results})
+
 @app.route('/api/designations', methods=['GET'])
 @token_required
+@cached_listing('designations')
 def get_designations():
-    vendor_name = request.args.get('vendor_name')
     session = Session()
-    query = session.query(Designation)
-    if vendor_name:
-        query = query.filter_by(vendor_name=vendor_name)
-    designations = query.all()
-    result = [
-        {
-            'designation_id': d.designation_id,
-            'designation': d.designation,
-            'vendor_name': d.vendor_name
-        } for d in designations
-    ]
-    session.close()
-    return jsonify(result)
+    columns = {
+        'designation_id': Designation.designation_id,
+        'designation': Designation.designation,
+        'vendor_name': Designation.vendor_name
+    }
+    return list_response(session, session.query(Designation), columns, key='designation_id', filterable=['vendor_name'])
 
 @app.route('/api/designations', methods=['POST'])
 @admin_required
+@invalidates('designations')
 def add_designation():
     data = request.get_json()
     designation = data.get('designation')
@@ -499,6 +1046,7 @@ def add_designation():
 
 @app.route('/api/designations/<int:designation_id>', methods=['PUT'])
 @admin_required
+@invalidates('designations')
 def update_designation(designation_id):
     data = request.get_json()
     session = Session()
@@ -514,6 +1062,7 @@ def update_designation(designation_id):
 
 @app.route('/api/designations/<int:designation_id>', methods=['DELETE'])
 @admin_required
+@invalidates('designations')
 def delete_designation(designation_id):
     session = Session()
     d = session.query(Designation).filter_by(designation_id=designation_id).first()
@@ -525,69 +1074,237 @@ def delete_designation(designation_id):
     session.close()
     return jsonify({'message': 'Designation deleted successfully'})
 
+# Employees prefetched per IN (...) query during attendance submission
+PREFETCH_CHUNK_SIZE = 5000
+
+def upsert_statement(session, table, index_elements, update_columns):
+    """Build a dialect-native ``INSERT ... ON CONFLICT DO UPDATE`` for ``table``.
+
+    Returns None for dialects without native upsert support.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={c: stmt.excluded[c] for c in update_columns}
+    )
+
+def current_employees(session, emp_ids):
+    """The employee columns attendance submission writes or checks, read in the caller's transaction."""
+    emp_ids = list(emp_ids)
+    employees = {}
+    for start in range(0, len(emp_ids), PREFETCH_CHUNK_SIZE):
+        rows = session.execute(select(
+            Employee.emp_id, Employee.approver_emp_id, Employee.vendor_name, Employee.designation_id,
+            Employee.doj, Employee.resignation_date, BillingCycleRule.start_day
+        ).outerjoin(BillingCycleRule, Employee.billing_rule_id == BillingCycleRule.rule_id)
+         .where(Employee.emp_id.in_(emp_ids[start:start + PREFETCH_CHUNK_SIZE])))
+        employees.update((row.emp_id, row) for row in rows)
+    return employees
+
+def save_monthly_attendance(records):
+    """Validate and upsert attendance ``records``; returns the per-record report."""
+    results = [
+        {'index': i, 'emp_id': rec.get('emp_id'), 'year': rec.get('year'), 'month': rec.get('month')}
+        for i, rec in enumerate(records)
+    ]
+    def reject(i, reason):
+        results[i]['status'] = 'rejected'
+        results[i]['reason'] = reason
+
+    session = Session()
+    try:
+        prefiltered = []
+        archived = archived_years()
+        for i, rec in enumerate(records):
+            if not (rec.get('emp_id') and rec.get('year') and rec.get('month')):
+                reject(i, 'emp_id, year and month are required')
+            elif rec['year'] in archived:
+                reject(i, f'{rec["year"]} is archived')
+            else:
+                prefiltered.append(i)
+
+        # Read in this transaction, not from the employee directory, which can lag another process's update
+        employees = current_employees(session, {records[i]['emp_id'] for i in prefiltered})
+        candidates = []
+        for i in prefiltered:
+            if records[i]['emp_id'] in employees:
+                candidates.append(i)
+            else:
+                reject(i, 'Employee not found')
+
+        # Explicit approvers must exist; the foreign key would otherwise fail the whole submission
+        requested = list({records[i].get('approver_emp_id') for i in candidates
+                          if isinstance(records[i].get('approver_emp_id'), str)})
+        approvers = set()
+        for start in range(0, len(requested), PREFETCH_CHUNK_SIZE):
+            approvers.update(session.execute(select(Approver.emp_id).where(
+                Approver.emp_id.in_(requested[start:start + PREFETCH_CHUNK_SIZE])
+            )).scalars())
+
+        # Eligibility is checked in memory for the whole batch; the last record for an (emp_id, year, month) wins
+        def eligibility_row(i):
+            rec, emp = records[i], employees[records[i]['emp_id']]
+            return (emp.start_day, rec['year'], rec['month'], emp.doj, emp.resignation_date,
+                    rec.get('payable_days'), rec.get('leaves_taken'))
+        reasons = ineligibility_reasons(map(eligibility_row, candidates))
+        accepted = {}
+        for i, reason in zip(candidates, reasons):
+            approver = records[i].get('approver_emp_id')
+            if not reason and approver and not (isinstance(approver, str) and approver in approvers):
+                reason = 'Approver not found'
+            if reason:
+                reject(i, reason)
+                continue
+            rec = records[i]
+            emp_id, year, month = rec['emp_id'], rec['year'], rec['month']
+            emp = employees[emp_id]
+            key = (emp_id, year, month)
+            if key in accepted:
+                reject(accepted[key][0], 'Superseded by a later record in this submission')
+            accepted[key] = (i, {
+                'emp_id': emp_id,
+                'approver_emp_id': rec.get('approver_emp_id') or emp.approver_emp_id,
+                'year': year,
+                'month': month,
+                'working_days': rec.get('payable_days'),
+                'leaves_taken': rec.get('leaves_taken'),
+            })
+
+        rows = [row for _, row in accepted.values()]
+        if rows:
+            change_seq = next_change_seq(session)
+            for row in rows:
+                row['change_seq'] = change_seq
+            replaced = []
+            # Summary groups touched by this submission, including the ones rows move out of
+            groups = {
+                (row['year'], row['month'], employees[row['emp_id']].vendor_name,
+                 employees[row['emp_id']].designation_id, row['approver_emp_id'])
+                for row in rows
+            }
+            keys = list(accepted)
+            for start in range(0, len(keys), PREFETCH_CHUNK_SIZE):
+                previous = session.query(
+                    MonthlyAttendance.id, MonthlyAttendance.emp_id, MonthlyAttendance.year, MonthlyAttendance.month,
+                    MonthlyAttendance.approver_emp_id
+                ).filter(tuple_(
+                    MonthlyAttendance.emp_id, MonthlyAttendance.year, MonthlyAttendance.month
+                ).in_(keys[start:start + PREFETCH_CHUNK_SIZE]))
+                for prev in previous:
+                    emp = employees[prev.emp_id]
+                    groups.add((prev.year, prev.month, emp.vendor_name, emp.designation_id, prev.approver_emp_id))
+                    replaced.append({'attendance_id': prev.id, 'emp_id': prev.emp_id,
+                                     'approver_emp_id': prev.approver_emp_id, 'year': prev.year, 'month': prev.month})
+
+            stmt = upsert_statement(
+                session,
+                MonthlyAttendance.__table__,
+                ['emp_id', 'year', 'month'],
+                ['approver_emp_id', 'working_days', 'leaves_taken', 'change_seq']
+            )
+            if stmt is not None:
+                session.execute(stmt, rows)
+                # Rows moving to another approver leave the old approver's listings
+                record_tombstones(session, [
+                    prev for prev in replaced
+                    if accepted[prev['emp_id'], prev['year'], prev['month']][1]['approver_emp_id'] != prev['approver_emp_id']
+                ], change_seq)
+            else:
+                # Portable fallback: clear the affected periods, then bulk insert (the rows get new ids)
+                for emp_id, year, month in accepted:
+                    session.query(MonthlyAttendance).filter_by(emp_id=emp_id, year=year, month=month).delete()
+                session.execute(MonthlyAttendance.__table__.insert(), rows)
+                record_tombstones(session, replaced, change_seq)
+            refresh_attendance_summary(session, groups)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    for i, _ in accepted.values():
+        results[i]['status'] = 'accepted'
+    return {
+        'message': f'{len(rows)} attendance records saved successfully',
+        'accepted': len(rows),
+        'rejected': len(records) - len(rows),
+        'results': results
+    }
+
+@job_handler('monthly_attendance')
+def monthly_attendance_job(payload, progress):
+    # Upserts are idempotent, so the default retries are safe
+    return save_monthly_attendance(payload['records'])
+
 @app.route('/api/monthly-attendance', methods=['POST'])
+@route_class('submit')
 @token_required
 def submit_monthly_attendance():
+    """Save attendance records; with ``?async=true`` queue them and return 202 with a job id."""
     data = request.get_json()
     records = data.get('records', [])
     if not isinstance(records, list):
         return jsonify({'error': 'Invalid data format'}), 400
-    session = Session()
-    from models import MonthlyAttendance, Employee
-    valid_records = []
-    for rec in records:
-        emp_id = rec.get('emp_id')
-        approver_emp_id = rec.get('approver_emp_id')  # Not used, but can be checked if needed
-        year = rec.get('year')
-        month = rec.get('month')
-        payable_days = rec.get('payable_days')
-        leaves_taken = rec.get('leaves_taken')
-        if not (emp_id and year and month):
-            continue
-        emp = session.query(Employee).filter_by(emp_id=emp_id).first()
-        if not emp:
-            continue
-        # Calculate billing period boundaries
-        billing_start_day = emp.billing_rule.start_day if emp.billing_rule else 1
-        period_start = datetime.date(year, month, billing_start_day)
-        # Next month for period end
-        next_month = month + 1 if month < 12 else 1
-        next_year = year if month < 12 else year + 1
-        period_end = datetime.date(next_year, next_month, billing_start_day)
-        # Check if period is before joining or after resignation
-        if period_end <= emp.doj:
-            continue
-        if emp.resignation_date and period_start > emp.resignation_date:
-            continue
-        # Upsert: delete existing for emp_id, year, month
-        session.query(MonthlyAttendance).filter_by(emp_id=emp_id, year=year, month=month).delete()
-        attendance = MonthlyAttendance(
-            emp_id=emp_id,
-            approver_emp_id=approver_emp_id,
-            year=year,
-            month=month,
-            working_days=payable_days,
-            leaves_taken=leaves_taken
+    if request.args.get('async') == 'true':
+        return accepted_job('monthly_attendance', {'records': records})
+    return jsonify(save_monthly_attendance(records))
+
+ATTENDANCE_COLUMNS = {
+    'id': MonthlyAttendance.id,
+    'emp_id': MonthlyAttendance.emp_id,
+    'name': Employee.name,
+    'approver_emp_id': MonthlyAttendance.approver_emp_id,
+    'month': MonthlyAttendance.month,
+    'year': MonthlyAttendance.year,
+    'vendor_name': Employee.vendor_name,
+    'designation': Designation.designation,
+    'working_days': MonthlyAttendance.working_days,
+    'leaves_taken': MonthlyAttendance.leaves_taken,
+    'loss_of_pay': MonthlyAttendance.loss_of_pay,
+    'resigned': Employee.resigned,
+}
+
+def designation_ids(session, designation, exact=False):
+    """Resolve a designation search to the matching designation_ids.
+
+    Substring matches are served by the pg_trgm index on Postgres and the FTS5
+    trigram table on SQLite; exact matches compare case-insensitively.
+    """
+    if exact:
+        query = session.query(Designation.designation_id).filter(
+            func.lower(Designation.designation) == designation.lower()
         )
-        valid_records.append(attendance)
-    session.add_all(valid_records)
-    session.commit()
-    session.close()
-    return jsonify({'message': f'{len(valid_records)} attendance records saved successfully'})
+    elif session.get_bind().dialect.name == 'sqlite':
+        rows = session.execute(
+            text('SELECT rowid FROM designation_fts WHERE designation LIKE :pattern'),
+            {'pattern': f'%{designation}%'}
+        )
+        return [row[0] for row in rows]
+    else:
+        query = session.query(Designation.designation_id).filter(Designation.designation.ilike(f"%{designation}%"))
+    return [row.designation_id for row in query]
 
-@app.route('/api/monthly-attendance', methods=['GET'])
-@token_required
-def get_monthly_attendance():
-    session = Session()
-    from models import MonthlyAttendance, Employee, Designation, Vendor
-    # Get filters from query params
-    emp_id = request.args.get('emp_id')
-    approver_emp_id = request.args.get('approver_emp_id')
-    month = request.args.get('month', type=int)
-    year = request.args.get('year', type=int)
-    vendor_name = request.args.get('vendor_name')
-    designation = request.args.get('designation')
-    resigned = request.args.get('resigned')
+# Query parameters monthly_attendance_query filters on (designation_match only qualifies designation)
+ATTENDANCE_FILTERS = ['emp_id', 'approver_emp_id', 'month', 'year', 'vendor_name', 'designation', 'resigned']
+
+def monthly_attendance_query(session, args):
+    """Build the joined, filtered attendance query for the ATTENDANCE_FILTERS in ``args``."""
+    emp_id = args.get('emp_id')
+    approver_emp_id = args.get('approver_emp_id')
+    month = args.get('month', type=int)
+    year = args.get('year', type=int)
+    vendor_name = args.get('vendor_name')
+    designation = args.get('designation')
+    designation_match = args.get('designation_match')
+    resigned = args.get('resigned')
 
     query = session.query(MonthlyAttendance, Employee, Designation)
     query = query.join(Employee, MonthlyAttendance.emp_id == Employee.emp_id)
@@ -604,32 +1321,409 @@ def get_monthly_attendance():
     if vendor_name:
         query = query.filter(Employee.vendor_name == vendor_name)
     if designation:
-        query = query.filter(Designation.designation.ilike(f"%{designation}%"))
+        # Resolve names to ids up front so the join filters on an integer IN list
+        ids = designation_ids(session, designation, exact=designation_match == 'exact')
+        query = query.filter(Employee.designation_id.in_(ids))
     if resigned == 'true':
         query = query.filter(Employee.resigned == True)
     elif resigned == 'false':
         query = query.filter(Employee.resigned == False)
+    return query
 
-    results = query.all()
-    data = []
-    for att, emp, des in results:
-        data.append({
-            'id': att.id,
-            'emp_id': att.emp_id,
-            'name': emp.name,
-            'approver_emp_id': att.approver_emp_id,
-            'month': att.month,
-            'year': att.year,
-            'vendor_name': emp.vendor_name,
-            'designation': des.designation,
-            'working_days': att.working_days,
-            'leaves_taken': att.leaves_taken,
-            'loss_of_pay': getattr(att, 'loss_of_pay', None),
-            'resigned': emp.resigned,
-        })
-    session.close()
-    return jsonify(data)
+@app.route('/api/monthly-attendance', methods=['GET'])
+@token_required
+def get_monthly_attendance():
+    year = request.args.get('year', type=int)
+    if year in archived_years():
+        return archived_attendance(year)
+    session = Session()
+    query = monthly_attendance_query(session, request.args)
+    return list_response(session, query, ATTENDANCE_COLUMNS, key='id')
+
+def archived_attendance(year):
+    """GET /api/monthly-attendance for a year served from its archive file; see attendance_history.py."""
+    try:
+        fields, columnar, limit = list_params(ATTENDANCE_COLUMNS)
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        rows = read_archive(year, request.args, fields, after, None if limit is None else limit + 1)
+        if limit is not None:
+            rows = list(rows)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_page(Session(), rows, fields, 'id', columnar, limit)
+
+@app.route('/api/monthly-attendance/changes', methods=['GET'])
+@token_required
+def get_monthly_attendance_changes():
+    """Attendance rows inserted, updated or removed since ``since``, for polling dashboards.
+
+    Takes the GET /api/monthly-attendance filters plus ``since``, the ``next``
+    token of the previous response (omit it for a full snapshot). Returns
+    ``{"next": ..., "deleted": [ids], "upserted": [rows]}``; clients drop the
+    deleted ids first, then add or replace the upserted rows. Deletions are
+    filtered on emp_id, approver_emp_id, year and month only, so ``deleted``
+    may name ids the client never had. An archived year's snapshot is read
+    from its archive file, and polls for it return no changes until the year is
+    restored (restored rows carry a new token).
+    """
+    try:
+        since = int(request.args.get('since', '0'))
+        if since < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'since must be a token returned by this endpoint'}), 400
+    session = Session()
+    # Take the token first; whatever commits after this is picked up by the next poll
+    next_token = current_change_seq(session)
+    fields = list(ATTENDANCE_COLUMNS)
+    year = request.args.get('year', type=int)
+    if year in archived_years():
+        rows = () if since else read_archive(year, request.args, fields)
+        return stream_json_array(session, rows, lambda row: {f: getattr(row, f) for f in fields},
+                                 prefix='{"next":"%d","deleted":[],"upserted":[' % next_token, suffix=']}\n')
+    query = monthly_attendance_query(session, request.args)
+    deleted = []
+    if since:
+        changed = union(
+            select(MonthlyAttendance.id).where(MonthlyAttendance.change_seq > since),
+            select(MonthlyAttendance.id).join(Employee, MonthlyAttendance.emp_id == Employee.emp_id)
+            .where(Employee.change_seq > since),
+        )
+        query = query.filter(MonthlyAttendance.id.in_(changed))
+        tombstones = session.query(AttendanceTombstone.attendance_id).filter(AttendanceTombstone.change_seq > since)
+        for name in ('emp_id', 'approver_emp_id', 'year', 'month'):
+            if request.args.get(name):
+                column = getattr(AttendanceTombstone, name)
+                try:
+                    tombstones = tombstones.filter(column == coerce_arg(column, request.args[name]))
+                except ValueError as e:
+                    session.close()
+                    return jsonify({'error': str(e)}), 400
+        deleted = sorted(attendance_id for attendance_id, in tombstones.distinct())
+    query = keyset_query(query, ATTENDANCE_COLUMNS, fields, 'id').yield_per(STREAM_CHUNK_SIZE)
+    prefix = '{"next":"%d","deleted":%s,"upserted":[' % (next_token, app.json.dumps(deleted))
+    return stream_json_array(session, query, lambda row: {f: getattr(row, f) for f in fields},
+                             prefix=prefix, suffix=']}\n')
+
+@app.route('/api/approvers/<manager_emp_id>/org/monthly-attendance', methods=['GET'])
+@token_required
+def get_org_monthly_attendance(manager_emp_id):
+    """Attendance approved by anyone under ``manager_emp_id``; takes the GET /api/monthly-attendance filters."""
+    denied = org_scope(manager_emp_id)
+    if denied:
+        return denied
+    session = Session()
+    query = monthly_attendance_query(session, request.args)
+    query = query.join(ApproverClosure, under_manager(MonthlyAttendance.approver_emp_id, manager_emp_id))
+    return list_response(session, query, ATTENDANCE_COLUMNS, key='id')
+
+@app.route('/api/attendance-summary', methods=['GET'])
+@token_required
+def get_attendance_summary():
+    """Attendance totals from the rollup table.
+
+    Filters: year, month, vendor_name, designation_id, approver_emp_id.
+    ``group_by`` (comma-separated subset of those) rolls the rows up further,
+    e.g. group_by=year,month,vendor_name for vendor invoicing.
+    """
+    group_by = [k.strip() for k in request.args.get('group_by', ','.join(SUMMARY_KEY)).split(',') if k.strip()]
+    unknown = [k for k in group_by if k not in SUMMARY_KEY]
+    if unknown:
+        return jsonify({'error': f'Unknown group_by fields: {", ".join(unknown)}'}), 400
+    session = Session()
+    try:
+        query = session.query(
+            *(getattr(AttendanceSummary, k) for k in group_by),
+            *(func.sum(getattr(AttendanceSummary, k)).label(k) for k in SUMMARY_TOTALS)
+        )
+        for name in SUMMARY_KEY:
+            if request.args.get(name):
+                column = getattr(AttendanceSummary, name)
+                query = query.filter(column == coerce_arg(column, request.args[name]))
+        if group_by:
+            query = query.group_by(*(getattr(AttendanceSummary, k) for k in group_by))
+            query = query.order_by(*(getattr(AttendanceSummary, k) for k in group_by))
+        result = [
+            {k: (getattr(row, k) if k in group_by else int(getattr(row, k) or 0)) for k in group_by + list(SUMMARY_TOTALS)}
+            for row in query
+        ]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        session.close()
+    return jsonify(result)
+
+@job_handler('rebuild_attendance_summary')
+def rebuild_attendance_summary_job(payload, progress):
+    session = Session()
+    try:
+        refresh_attendance_summary(session)
+        session.commit()
+    finally:
+        session.close()
+    return {'message': 'Attendance summary rebuilt successfully'}
+
+@app.route('/api/attendance-summary/rebuild', methods=['POST'])
+@admin_required
+def rebuild_attendance_summary():
+    """Queue a full rollup rebuild, e.g. after a bulk import or archive restore."""
+    return accepted_job('rebuild_attendance_summary', {})
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def csv_chunks(row_batches, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in row_batches:
+        writer.writerows([getattr(row, f) for f in fields] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def ndjson_chunks(row_batches, fields):
+    for batch in row_batches:
+        yield ''.join(
+            app.json.dumps({f: getattr(row, f) for f in fields}, sort_keys=False) + '\n'
+            for row in batch
+        )
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_chunks(row_batches, fields):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    # One row group per fetched batch keeps memory at one batch
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in row_batches:
+            writer.write_table(pa.Table.from_pydict(
+                {f: [getattr(row, f) for row in batch] for f in fields}, schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+EXPORT_WRITERS = {'csv': csv_chunks, 'ndjson': ndjson_chunks, 'parquet': parquet_chunks}
+
+@app.route('/api/monthly-attendance/export', methods=['GET'])
+@route_class('export')
+@token_required
+def export_monthly_attendance():
+    """Stream the filtered attendance listing as CSV, NDJSON or Parquet.
+
+    Accepts the same filters as GET /api/monthly-attendance. Rows are read
+    through a server-side cursor in STREAM_CHUNK_SIZE batches, so memory stays
+    flat regardless of result size.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_WRITERS:
+        return jsonify({'error': f'format must be one of {", ".join(EXPORT_WRITERS)}'}), 400
+    if export_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({'error': 'Parquet export requires pyarrow to be installed'}), 501
+
+    session = Session()
+    fields = list(ATTENDANCE_COLUMNS)
+    year = request.args.get('year', type=int)
+    if year in archived_years():
+        rows = read_archive(year, request.args, fields)
+    else:
+        query = keyset_query(monthly_attendance_query(session, request.args), ATTENDANCE_COLUMNS, fields, 'id')
+        rows = query.execution_options(stream_results=True).yield_per(STREAM_CHUNK_SIZE)
+
+    def generate():
+        try:
+            yield from EXPORT_WRITERS[export_format](batches(rows, STREAM_CHUNK_SIZE), fields)
+        finally:
+            session.close()
+
+    # Only the parsed integers reach the header; raw query values could inject quotes or paths
+    month = request.args.get('month', type=int)
+    period = ''.join(f'-{value:02d}' for value in (year, month) if value)
+    filename = f'monthly-attendance{period}.{export_format}'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+# Uploads are handed to the job workers through this directory
+IMPORT_UPLOAD_DIR = os.getenv('IMPORT_UPLOAD_DIR', tempfile.gettempdir())
+
+@job_handler('import', max_attempts=1)
+def import_job(payload, progress):
+    # Batches are committed as they go, so a failed import is not retried blindly
+    session = Session()
+    try:
+        return run_import(session, payload['table'], payload['path'], payload['filename'], progress)
+    finally:
+        if payload['table'] == 'approvers':
+            # Imported batches are already committed, so rebuild even after a failure
+            session.rollback()
+            rebuild_approver_closure(session)
+            session.commit()
+        session.close()
+        os.remove(payload['path'])
+        # This runs in a job worker: the web processes learn about the import through the database
+        with engine.begin() as connection:
+            bump_cache_generation(connection)
+
+@app.route('/api/import/<table>', methods=['POST'])
+@route_class('bulk')
+@admin_required
+def start_import(table):
+    """Queue a CSV/XLSX upload (multipart field ``file``) for bulk import into ``table``."""
+    if table not in IMPORT_TABLES:
+        return jsonify({'error': f'table must be one of {", ".join(IMPORT_TABLES)}'}), 404
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'file is required'}), 400
+    suffix = os.path.splitext(upload.filename)[1].lower()
+    if suffix not in ('.csv', '.xlsx'):
+        return jsonify({'error': 'file must be a .csv or .xlsx upload'}), 400
+    if suffix == '.xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return jsonify({'error': 'XLSX import requires openpyxl to be installed'}), 501
+    # The upload stream closes with the request, so the worker reads from a saved copy
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=IMPORT_UPLOAD_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        upload.save(f)
+    return accepted_job('import', {'table': table, 'path': path, 'filename': upload.filename})
+
+@app.route('/api/import/jobs/<job_id>/errors', methods=['GET'])
+@admin_required
+@primary_reads
+def get_import_errors(job_id):
+    job = job_status(job_id)
+    if not job or job['kind'] != 'import':
+        return jsonify({'error': 'Import job not found'}), 404
+    errors = (job['result'] or {}).get('error_report', [])
+    if request.args.get('format') == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=['row', 'field', 'error'])
+        writer.writeheader()
+        writer.writerows(errors)
+        return Response(buffer.getvalue(), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename="import-{job_id}-errors.csv"'})
+    return jsonify({'job_id': job_id, 'errors': errors, 'total': (job['result'] or {}).get('errors', 0)})
+
+def accepted_job(kind, payload):
+    """Queue a job for the current user and answer 202 with where to poll it."""
+    job_id = enqueue(kind, payload, created_by=g.claims.get('username'))
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/api/jobs/{job_id}'}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+@primary_reads
+def get_job(job_id):
+    job = job_status(job_id)
+    # Approvers only see their own jobs
+    if not job or (not g.claims.get('is_admin') and job['created_by'] != g.claims.get('username')):
+        return jsonify({'error': 'Job not found'}), 404
+    if job['result'] and job['kind'] == 'import':
+        # The full error report is served by /api/import/jobs/<id>/errors
+        job['result'] = {k: v for k, v in job['result'].items() if k != 'error_report'}
+    return jsonify(job)
+
+@app.route('/internal/pool', methods=['GET'])
+@admin_required
+def get_pool_stats():
+    return jsonify({**pool_stats(engine), 'replicas': replicas.stats()})
+
+
+# Set once warm_up() has run in this process; /readyz reports not-ready until then
+warmed_up = threading.Event()
+
+def warm_up():
+    """Open the pool's connections and fill the master-data cache before taking traffic."""
+    connections = [engine.connect() for _ in range(pool_stats(engine).get('size', 1))]
+    for connection in connections:
+        connection.execute(text('SELECT 1'))
+        connection.close()
+    # Baseline for later cache_generation checks
+    generation_watch.poll()
+    # First replica lag check; an unreachable replica only means reads stay on the primary
+    replicas.choose()
+    employee_directory.ensure_fresh()
+    token = jwt.encode({
+        'username': ADMIN_USER['username'],
+        'is_admin': True,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=1)
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+    client = app.test_client()
+    for table in MASTER_TABLES:
+        client.get(f'/api/{table}', headers={'Authorization': f'Bearer {token}'})
+    warmed_up.set()
+
+# Seconds between warm-up attempts while the database is unreachable
+WARM_UP_RETRY_SECONDS = float(os.getenv('WARM_UP_RETRY_SECONDS', '5'))
+
+def warm_up_with_retry():
+    """Run warm_up(), retrying in the background until it succeeds.
+
+    A failure (say the database is down at boot) is logged instead of killing
+    the worker, which gunicorn would only respawn into the same failure;
+    /readyz keeps answering 503 until a retry succeeds.
+    """
+    try:
+        warm_up()
+    except Exception:
+        logger.exception('Warm-up failed; retrying in %s seconds', WARM_UP_RETRY_SECONDS)
+        retry = threading.Timer(WARM_UP_RETRY_SECONDS, warm_up_with_retry)
+        retry.daemon = True
+        retry.start()
+
+@app.route('/healthz', methods=['GET'])
+@route_class(None)
+def healthz():
+    # Liveness only: the process is serving requests
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+@route_class(None)
+def readyz():
+    if not warmed_up.is_set():
+        return jsonify({'status': 'warming up'}), 503
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+    except Exception as e:
+        return jsonify({'status': 'database unavailable', 'error': type(e).__name__}), 503
+    return jsonify({'status': 'ready'})
 
 
 if __name__ == '__main__':
+    # Development server; see gunicorn.conf.py for production
+    warm_up_with_retry()
     app.run(debug=True, port='8000')
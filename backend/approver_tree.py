@@ -0,0 +1,99 @@
+# approver_tree.py
+"""
+Maintenance of the approver_closure table.
+Every approver has a depth-0 row for itself plus one row per manager above it,
+so "everything under manager M" is a single indexed join on
+ancestor_emp_id = M. Approver handlers call add/move/remove_approver_node in
+the same transaction as the approver change; bulk loads call
+rebuild_approver_closure afterwards.
+"""
+from sqlalchemy import select, delete, exists, and_, true
+from models import Approver, ApproverClosure
+
+closure = ApproverClosure.__table__
+INSERT_CHUNK_SIZE = 10000
+
+
+def _descendants(emp_id):
+    return select(closure.c.descendant_emp_id).where(closure.c.ancestor_emp_id == emp_id)
+
+
+def _ensure_node(session, emp_id):
+    # Managers who are not approvers get a node the first time someone reports to them
+    if not _reports_to(session, emp_id, emp_id):
+        session.execute(closure.insert().values(ancestor_emp_id=emp_id, descendant_emp_id=emp_id, depth=0))
+
+
+def _reports_to(session, emp_id, manager_emp_id):
+    return session.execute(select(exists().where(and_(
+        closure.c.ancestor_emp_id == manager_emp_id, closure.c.descendant_emp_id == emp_id
+    )))).scalar()
+
+
+def _attach(session, emp_id, manager_emp_id):
+    if manager_emp_id == emp_id or _reports_to(session, manager_emp_id, emp_id):
+        raise ValueError(f'{manager_emp_id} reports to {emp_id}; the change would create a cycle')
+    _ensure_node(session, manager_emp_id)
+    above = closure.alias('above')
+    below = closure.alias('below')
+    session.execute(closure.insert().from_select(
+        ['ancestor_emp_id', 'descendant_emp_id', 'depth'],
+        select(above.c.ancestor_emp_id, below.c.descendant_emp_id, above.c.depth + below.c.depth + 1)
+        .select_from(above.join(below, true()))
+        .where(above.c.descendant_emp_id == manager_emp_id, below.c.ancestor_emp_id == emp_id)
+    ))
+
+
+def _detach(session, emp_id):
+    # Drop the links between emp_id's subtree and everything above emp_id
+    subtree = _descendants(emp_id)
+    session.execute(delete(closure).where(
+        closure.c.descendant_emp_id.in_(subtree), closure.c.ancestor_emp_id.not_in(subtree)
+    ))
+
+
+def add_approver_node(session, emp_id, manager_emp_id):
+    """Record a new approver under ``manager_emp_id``; raises ValueError on a cycle."""
+    _ensure_node(session, emp_id)
+    if manager_emp_id:
+        _attach(session, emp_id, manager_emp_id)
+
+
+def move_approver_node(session, emp_id, manager_emp_id):
+    """Move ``emp_id`` and everyone under it to ``manager_emp_id``; raises ValueError on a cycle."""
+    _ensure_node(session, emp_id)
+    _detach(session, emp_id)
+    if manager_emp_id:
+        _attach(session, emp_id, manager_emp_id)
+
+
+def remove_approver_node(session, emp_id):
+    """Unlink a deleted approver; its reports stay grouped under its emp_id."""
+    _detach(session, emp_id)
+    has_reports = session.execute(select(exists().where(and_(
+        closure.c.ancestor_emp_id == emp_id, closure.c.depth > 0
+    )))).scalar()
+    if not has_reports:
+        session.execute(delete(closure).where(closure.c.ancestor_emp_id == emp_id))
+
+
+def rebuild_approver_closure(session):
+    """Recompute the whole closure table from approver.manager_emp_id. Runs in the caller's transaction."""
+    managers = dict(session.execute(select(Approver.emp_id, Approver.manager_emp_id)).all())
+    depths = {}
+    for emp_id in managers:
+        node, depth, seen = emp_id, 0, set()
+        # ``seen`` stops at cycles left over in legacy data
+        while node and node not in seen:
+            depths[node, emp_id] = depth
+            seen.add(node)
+            if node not in managers:
+                # A manager who is not an approver tops the chain
+                depths[node, node] = 0
+                break
+            node, depth = managers[node], depth + 1
+    rows = [{'ancestor_emp_id': a, 'descendant_emp_id': d, 'depth': depth} for (a, d), depth in depths.items()]
+    session.execute(delete(closure))
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        session.execute(closure.insert(), rows[start:start + INSERT_CHUNK_SIZE])
+    return len(rows)
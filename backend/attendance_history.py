@@ -0,0 +1,321 @@
+# attendance_history.py
+"""
+Year partitions and cold-history archives for monthly_attendance.
+
+On Postgres monthly_attendance is range-partitioned by year (see models.py):
+each year lives in monthly_attendance_y<year>, anything without its own
+partition in monthly_attendance_default, and queries filtered on year only
+touch that year's partition. Closed years can be archived: their listing rows
+are written to a zstd-compressed Parquet file in id order and removed from the
+database; GET /api/monthly-attendance?year=<year> and the export then read the
+file instead, one batch at a time. Archived rows keep the employee name, vendor, designation and
+resigned flag as they were when archived.
+
+Usage:
+    python attendance_history.py partitions --through 2027 [--from 2020]
+    python attendance_history.py archive 2021 [--force]
+    python attendance_history.py restore 2021
+    python attendance_history.py list
+"""
+import argparse
+import datetime
+import itertools
+import os
+from collections import namedtuple
+from sqlalchemy import text, delete
+from models import MonthlyAttendance
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - archives need pyarrow
+    pa = None
+
+ARCHIVE_DIR = os.getenv('ATTENDANCE_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive'))
+DEFAULT_PARTITION = 'monthly_attendance_default'
+# monthly_attendance columns restored from an archive; loss_of_pay is computed
+RESTORED_COLUMNS = ('id', 'emp_id', 'approver_emp_id', 'year', 'month', 'working_days', 'leaves_taken')
+INSERT_CHUNK_SIZE = 10000
+# Archive rows per Parquet row group, and per batch when reading one back
+ARCHIVE_ROW_GROUP_SIZE = 65536
+ARCHIVE_BATCH_SIZE = 10000
+
+
+def partition_name(year):
+    return f'monthly_attendance_y{int(year)}'
+
+
+def year_partitions(connection):
+    """Years that have their own partition (Postgres)."""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits"
+        " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+        " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+        " WHERE parent.relname = 'monthly_attendance'"
+    )).scalars()
+    return {int(name.rsplit('_y', 1)[1]) for name in names if name.startswith('monthly_attendance_y')}
+
+
+def ensure_year_partitions(connection, years):
+    """Create the missing yearly partitions for ``years``; a no-op except on Postgres.
+
+    Rows already sitting in the default partition for a new year are moved
+    into it. Returns the years created.
+    """
+    if connection.dialect.name != 'postgresql':
+        return []
+    existing = year_partitions(connection)
+    created = []
+    for year in sorted(set(years) - existing):
+        name = partition_name(year)
+        stranded = connection.execute(text(f'SELECT count(*) FROM {DEFAULT_PARTITION} WHERE year = :year'),
+                                      {'year': year}).scalar()
+        if stranded:
+            # A partition cannot be added while the default partition holds rows in its range
+            columns = ', '.join(RESTORED_COLUMNS + ('change_seq',))
+            connection.execute(text(f'ALTER TABLE monthly_attendance DETACH PARTITION {DEFAULT_PARTITION}'))
+            connection.execute(text(
+                f'CREATE TABLE {name} PARTITION OF monthly_attendance FOR VALUES FROM ({year}) TO ({year + 1})'
+            ))
+            connection.execute(text(
+                f'INSERT INTO monthly_attendance ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} WHERE year = :year'
+            ), {'year': year})
+            connection.execute(text(f'DELETE FROM {DEFAULT_PARTITION} WHERE year = :year'), {'year': year})
+            connection.execute(text(f'ALTER TABLE monthly_attendance ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT'))
+        else:
+            connection.execute(text(
+                f'CREATE TABLE {name} PARTITION OF monthly_attendance FOR VALUES FROM ({year}) TO ({year + 1})'
+            ))
+        created.append(year)
+    return created
+
+
+def archive_path(year):
+    return os.path.join(ARCHIVE_DIR, f'monthly_attendance_{int(year)}.parquet')
+
+
+def archived_years():
+    """Years whose attendance is served from an archive file."""
+    try:
+        names = os.listdir(ARCHIVE_DIR)
+    except FileNotFoundError:
+        return set()
+    return {
+        int(name[len('monthly_attendance_'):-len('.parquet')])
+        for name in names
+        if name.startswith('monthly_attendance_') and name.endswith('.parquet')
+    }
+
+
+def parquet_schema():
+    """Arrow schema of the attendance listing, shared by archives and the Parquet export."""
+    return pa.schema([
+        ('id', pa.int64()),
+        ('emp_id', pa.string()),
+        ('name', pa.string()),
+        ('approver_emp_id', pa.string()),
+        ('month', pa.int16()),
+        ('year', pa.int16()),
+        ('vendor_name', pa.string()),
+        ('designation', pa.string()),
+        ('working_days', pa.int16()),
+        ('leaves_taken', pa.int16()),
+        ('loss_of_pay', pa.int16()),
+        ('resigned', pa.bool_()),
+    ])
+
+
+def archive_year(session, year, rows, force=False):
+    """Move ``year`` out of monthly_attendance into its archive file; returns the row count.
+
+    ``rows`` yields the year's listing rows (attributes named like the
+    parquet_schema fields) ordered by id, and must be read through
+    ``session``. Only years before the current one are archived unless
+    ``force`` is set. Commits the session.
+
+    On Postgres the year's partition (or the whole table while the year has
+    none) is locked against writers before ``rows`` is read; everywhere the
+    number of rows removed must match the number archived, or nothing is.
+    """
+    if pa is None:
+        raise RuntimeError('Archiving requires pyarrow to be installed')
+    if year >= datetime.date.today().year and not force:
+        raise ValueError(f'{year} is not closed yet')
+    path = archive_path(year)
+    if os.path.exists(path):
+        raise ValueError(f'{year} is already archived')
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    schema = parquet_schema()
+    written = 0
+    tmp_path = path + '.tmp'
+    try:
+        partitioned = False
+        if session.get_bind().dialect.name == 'postgresql':
+            partitioned = year in year_partitions(session.connection())
+            # Submissions would otherwise land between reading the rows and dropping them
+            locked = partition_name(year) if partitioned else 'monthly_attendance'
+            session.execute(text(f'LOCK TABLE {locked} IN SHARE MODE'))
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            # In id order, so readers page through it without sorting and skip row groups before a cursor
+            for group in _chunks(rows, ARCHIVE_ROW_GROUP_SIZE):
+                writer.write_table(_arrow_table(group, schema))
+                written += len(group)
+        if partitioned:
+            session.execute(text(f'ALTER TABLE monthly_attendance DETACH PARTITION {partition_name(year)}'))
+            removed = session.execute(text(f'SELECT count(*) FROM {partition_name(year)}')).scalar()
+        else:
+            removed = session.execute(delete(MonthlyAttendance).where(MonthlyAttendance.year == year)).rowcount
+        if removed != written:
+            # Rolled back below, detach included
+            raise RuntimeError(f'Archived {written} rows of {year} but the table had {removed}')
+        if partitioned:
+            session.execute(text(f'DROP TABLE {partition_name(year)}'))
+        os.replace(tmp_path, path)
+        try:
+            session.commit()
+        except Exception:
+            os.remove(path)
+            raise
+    except Exception:
+        session.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _arrow_table(rows, schema):
+    return pa.Table.from_pydict({f: [getattr(row, f) for row in rows] for f in schema.names}, schema=schema)
+
+
+def restore_year(session, year, change_seq):
+    """Load an archived year back into monthly_attendance and delete its file; returns the row count.
+
+    Restored rows are stamped with ``change_seq`` so delta-sync clients pick
+    them up. Commits the session.
+    """
+    if pa is None:
+        raise RuntimeError('Restoring requires pyarrow to be installed')
+    path = archive_path(year)
+    if not os.path.exists(path):
+        raise ValueError(f'{year} is not archived')
+    ensure_year_partitions(session.connection(), [year])
+    rows = pq.read_table(path, columns=list(RESTORED_COLUMNS)).to_pylist()
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        session.execute(MonthlyAttendance.__table__.insert(), [
+            {**row, 'change_seq': change_seq} for row in rows[start:start + INSERT_CHUNK_SIZE]
+        ])
+    session.commit()
+    os.remove(path)
+    return len(rows)
+
+
+def read_archive(year, args, fields, after=None, limit=None):
+    """Rows of an archived year matching the GET /api/monthly-attendance filters in ``args``.
+
+    Yields up to ``limit`` rows (all when None) with id greater than
+    ``after``, ordered by id, as named tuples of ``fields`` followed by id
+    when it is not among them. The file is read ARCHIVE_BATCH_SIZE rows at a
+    time, skipping row groups that end before ``after``.
+    """
+    if pa is None:
+        raise RuntimeError('Reading archived attendance requires pyarrow to be installed')
+    condition = pc.field('year') == year
+    for name in ('emp_id', 'approver_emp_id', 'vendor_name'):
+        if args.get(name):
+            condition &= pc.field(name) == args[name]
+    if args.get('month', type=int):
+        condition &= pc.field('month') == args.get('month', type=int)
+    designation = args.get('designation')
+    if designation:
+        if args.get('designation_match') == 'exact':
+            condition &= pc.utf8_lower(pc.field('designation')) == designation.lower()
+        else:
+            condition &= pc.match_substring(pc.field('designation'), designation, ignore_case=True)
+    if args.get('resigned') in ('true', 'false'):
+        condition &= pc.field('resigned') == (args['resigned'] == 'true')
+    if after is not None:
+        condition &= pc.field('id') > after
+    selected = fields if 'id' in fields else fields + ['id']
+    return _archive_rows(pq.ParquetFile(archive_path(year)), condition, selected, after, limit)
+
+
+def _archive_rows(parquet, condition, selected, after, limit):
+    id_column = parquet.schema_arrow.get_field_index('id')
+    row_groups = []
+    for index in range(parquet.num_row_groups):
+        stats = parquet.metadata.row_group(index).column(id_column).statistics
+        if after is None or stats is None or not stats.has_min_max or stats.max > after:
+            row_groups.append(index)
+    Row = namedtuple('Row', selected)
+    remaining = limit
+    # The filter may reference columns beyond ``selected``, so batches carry them all
+    for batch in parquet.iter_batches(batch_size=ARCHIVE_BATCH_SIZE, row_groups=row_groups):
+        table = pa.Table.from_batches([batch]).filter(condition)
+        if remaining is not None:
+            table = table.slice(0, remaining)
+            remaining -= table.num_rows
+        for values in zip(*(table.column(f).to_pylist() for f in selected)):
+            yield Row(*values)
+        if remaining == 0:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    partitions = commands.add_parser('partitions', help='create yearly partitions (Postgres)')
+    partitions.add_argument('--from', dest='first', type=int, default=datetime.date.today().year)
+    partitions.add_argument('--through', type=int, required=True)
+    archive = commands.add_parser('archive', help='move a closed year to its archive file')
+    archive.add_argument('year', type=int)
+    archive.add_argument('--force', action='store_true', help='archive the current or a future year')
+    restore = commands.add_parser('restore', help='load an archived year back into the database')
+    restore.add_argument('year', type=int)
+    commands.add_parser('list', help='show archived years')
+    args = parser.parse_args()
+
+    from werkzeug.datastructures import MultiDict
+    from app import ATTENDANCE_COLUMNS, monthly_attendance_query
+    from changes import next_change_seq
+    from db import engine, Session
+
+    if args.command == 'partitions':
+        with engine.begin() as connection:
+            created = ensure_year_partitions(connection, range(args.first, args.through + 1))
+        print(f'Created partitions for {", ".join(map(str, created)) or "no new years"}.')
+    elif args.command == 'archive':
+        session = Session()
+        try:
+            query = monthly_attendance_query(session, MultiDict({'year': args.year}))
+            rows = query.with_entities(*[column.label(f) for f, column in ATTENDANCE_COLUMNS.items()]).order_by(
+                MonthlyAttendance.id
+            ).execution_options(stream_results=True).yield_per(INSERT_CHUNK_SIZE)
+            count = archive_year(session, args.year, rows, force=args.force)
+        finally:
+            session.close()
+        print(f'Archived {count} rows of {args.year} to {archive_path(args.year)}.')
+    elif args.command == 'restore':
+        session = Session()
+        try:
+            count = restore_year(session, args.year, next_change_seq(session))
+        finally:
+            session.close()
+        print(f'Restored {count} rows of {args.year}.')
+    else:
+        for year in sorted(archived_years()):
+            print(year, archive_path(year))
+
+
+if __name__ == '__main__':
+    main()
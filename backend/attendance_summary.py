@@ -0,0 +1,82 @@
+# attendance_summary.py
+"""
+Maintenance of the attendance_summary rollup.
+Totals are grouped by period, the employee's vendor and designation, and the
+approver of the attendance row. Writers call refresh_attendance_summary for the
+groups they touched in the same transaction: attendance submissions for the
+rows they save or replace, employee updates for the groups the employee's
+attendance moves between (employee_groups before and after the change).
+"""
+from collections import defaultdict
+from sqlalchemy import select, func, tuple_, and_, or_
+from attendance_history import archived_years
+from models import Employee, MonthlyAttendance, AttendanceSummary
+
+SUMMARY_KEY = ('year', 'month', 'vendor_name', 'designation_id', 'approver_emp_id')
+SUMMARY_TOTALS = ('headcount', 'working_days', 'leaves_taken', 'loss_of_pay')
+# Groups or employees per IN (...) list
+CHUNK_SIZE = 5000
+
+summary = AttendanceSummary.__table__
+source_key = (
+    MonthlyAttendance.year,
+    MonthlyAttendance.month,
+    Employee.vendor_name,
+    Employee.designation_id,
+    MonthlyAttendance.approver_emp_id,
+)
+
+
+def period_approvers(groups):
+    """A filter on ``groups``' periods and approvers that ix_attendance_period_approver can serve.
+
+    The group tuple spans the joined employee table, so it cannot be used to
+    find the attendance rows; this narrows them to the right index ranges first.
+    """
+    approvers = defaultdict(set)
+    for year, month, _, _, approver_emp_id in groups:
+        approvers[year, month].add(approver_emp_id)
+    return or_(*(
+        and_(MonthlyAttendance.year == year, MonthlyAttendance.month == month,
+             MonthlyAttendance.approver_emp_id.in_(sorted(ids)))
+        for (year, month), ids in approvers.items()
+    ))
+
+
+def refresh_attendance_summary(session, groups=None):
+    """Recompute attendance_summary rows for ``groups`` from monthly_attendance.
+
+    ``groups`` is an iterable of (year, month, vendor_name, designation_id,
+    approver_emp_id) tuples; None rebuilds the whole table. Runs in the caller's
+    transaction.
+    """
+    totals = select(*source_key, func.count(), func.sum(MonthlyAttendance.working_days),
+                    func.sum(MonthlyAttendance.leaves_taken), func.sum(MonthlyAttendance.loss_of_pay))
+    totals = totals.join(Employee, MonthlyAttendance.emp_id == Employee.emp_id).group_by(*source_key)
+    if groups is None:
+        # Archived years are no longer in monthly_attendance; keep their totals
+        archived = archived_years()
+        session.execute(summary.delete().where(summary.c.year.not_in(archived)))
+        session.execute(summary.insert().from_select(
+            SUMMARY_KEY + SUMMARY_TOTALS, totals.where(MonthlyAttendance.year.not_in(archived))
+        ))
+        return
+    groups = list(groups)
+    for start in range(0, len(groups), CHUNK_SIZE):
+        chunk = groups[start:start + CHUNK_SIZE]
+        session.execute(summary.delete().where(tuple_(*(summary.c[k] for k in SUMMARY_KEY)).in_(chunk)))
+        session.execute(summary.insert().from_select(
+            SUMMARY_KEY + SUMMARY_TOTALS, totals.where(period_approvers(chunk), tuple_(*source_key).in_(chunk))
+        ))
+
+
+def employee_groups(session, emp_ids):
+    """The summary groups holding attendance of ``emp_ids``, as the employees are now in the session."""
+    emp_ids = list(emp_ids)
+    groups = set()
+    for start in range(0, len(emp_ids), CHUNK_SIZE):
+        groups.update(tuple(row) for row in session.execute(
+            select(*source_key).distinct().join(Employee, MonthlyAttendance.emp_id == Employee.emp_id)
+            .where(MonthlyAttendance.emp_id.in_(emp_ids[start:start + CHUNK_SIZE]))
+        ))
+    return groups
@@ -0,0 +1,260 @@
+# batch.py
+"""
+Transactional batches of master-data mutations for POST /api/batch.
+Operations are applied in order inside the caller's transaction, validated
+with the importer's table specs and foreign-key check. Runs of consecutive
+operations of the same kind on the same table are coalesced into set-based
+statements: creates into one executemany INSERT, updates carrying identical
+data into one UPDATE ... WHERE key IN (...), deletes into one
+DELETE ... WHERE key IN (...). The first failing operation aborts the batch.
+"""
+import os
+from collections import namedtuple
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from importer import TABLES, foreign_key_errors
+from models import Approver, Employee
+from hashing import hash_password
+from approver_tree import add_approver_node, move_approver_node, remove_approver_node
+from changes import next_change_seq, tombstone_attendance_of, FILTERED_EMPLOYEE_FIELDS
+from attendance_summary import refresh_attendance_summary, employee_groups
+
+MAX_BATCH_OPERATIONS = int(os.getenv('MAX_BATCH_OPERATIONS', '5000'))
+# Keys per IN (...) list
+IN_CHUNK_SIZE = 1000
+OPERATIONS = ('create', 'update', 'delete')
+
+Operation = namedtuple('Operation', 'index kind table keys data')
+
+
+class BatchError(Exception):
+    """Aborts the batch; ``index`` is the operation that failed."""
+
+    def __init__(self, index, message, status=400):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+        self.status = status
+
+
+def key_column(spec):
+    return spec.model.__mapper__.primary_key[0]
+
+
+def chunks(values, size=IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def parse_fields(spec, data, index, partial):
+    """Parse ``data`` with the table's field parsers; ``partial`` skips the required-field check."""
+    unknown = [f for f in data if f not in spec.fields]
+    if unknown:
+        raise BatchError(index, f'Unknown fields: {", ".join(unknown)}')
+    row = {} if partial else dict.fromkeys(spec.fields)
+    for field, value in data.items():
+        try:
+            row[field] = spec.fields[field](value)
+        except (TypeError, ValueError) as e:
+            raise BatchError(index, f'{field}: invalid value: {e}')
+    if not partial:
+        missing = [f for f in spec.required if row[f] is None]
+        if missing:
+            raise BatchError(index, f'Missing required fields: {", ".join(missing)}')
+    return row
+
+
+def normalize(index, op):
+    """Check one raw operation and return it as an Operation."""
+    if not isinstance(op, dict):
+        raise BatchError(index, 'operation must be an object')
+    kind, table = op.get('op'), op.get('table')
+    if kind not in OPERATIONS:
+        raise BatchError(index, f'op must be one of {", ".join(OPERATIONS)}')
+    if table not in TABLES:
+        raise BatchError(index, f'table must be one of {", ".join(TABLES)}')
+    data = op.get('data')
+    if kind != 'delete' and not isinstance(data, dict):
+        raise BatchError(index, 'data must be an object')
+    keys = []
+    if kind != 'create':
+        keys = op['keys'] if 'keys' in op else [op.get('key')]
+        if not isinstance(keys, list) or not keys or any(k is None for k in keys):
+            raise BatchError(index, 'key or a non-empty keys list is required')
+        parse_key = TABLES[table].fields.get(key_column(TABLES[table]).key, int)
+        try:
+            keys = [parse_key(k) for k in keys]
+        except (TypeError, ValueError) as e:
+            raise BatchError(index, f'invalid key: {e}')
+    return Operation(index, kind, table, keys, data)
+
+
+def existing_keys(session, spec, keys):
+    column = key_column(spec)
+    found = set()
+    for chunk in chunks(list(set(keys))):
+        found.update(session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def referenced_keys(session, spec, rows):
+    """Key sets for the importer's foreign-key check, limited to the keys ``rows`` reference."""
+    fk_keys = {}
+    for field, column in spec.foreign_keys.items():
+        values = list({row[field] for row in rows if row.get(field) is not None})
+        fk_keys[field] = set()
+        for chunk in chunks(values):
+            fk_keys[field].update(session.execute(select(column).where(column.in_(chunk))).scalars())
+    return fk_keys
+
+
+def check_foreign_keys(session, spec, ops, rows):
+    fk_keys = referenced_keys(session, spec, rows)
+    for op, row in zip(ops, rows):
+        errors = foreign_key_errors(row, fk_keys)
+        if errors:
+            field, message = errors[0]
+            raise BatchError(op.index, f'{field}: {message}')
+
+
+def require_keys(session, spec, table, ops):
+    found = existing_keys(session, spec, [k for op in ops for k in op.keys])
+    for op in ops:
+        missing = [k for k in op.keys if k not in found]
+        if missing:
+            raise BatchError(op.index, f'{table} {missing[0]!r} not found', 404)
+
+
+class Batch:
+    """One batch run; holds the per-transaction change sequence value."""
+
+    def __init__(self, session):
+        self.session = session
+        self._change_seq = None
+
+    @property
+    def change_seq(self):
+        if self._change_seq is None:
+            self._change_seq = next_change_seq(self.session)
+        return self._change_seq
+
+    def create(self, table, spec, ops):
+        rows = [parse_fields(spec, op.data, op.index, partial=False) for op in ops]
+        # Report a bad reference against its operation rather than as a constraint error for the batch
+        check_foreign_keys(self.session, spec, ops, rows)
+        rows = [spec.transform(row) if spec.transform else row for row in rows]
+        if 'change_seq' in spec.model.__table__.c:
+            rows = [{**row, 'change_seq': self.change_seq} for row in rows]
+        if spec.key:
+            found = existing_keys(self.session, spec, [row[spec.key] for row in rows])
+            seen = set()
+            for op, row in zip(ops, rows):
+                if row[spec.key] in found or row[spec.key] in seen:
+                    raise BatchError(op.index, f'{table} {row[spec.key]!r} already exists', 409)
+                seen.add(row[spec.key])
+            self.session.execute(spec.model.__table__.insert(), rows)
+            keys = [row[spec.key] for row in rows]
+        else:
+            # Generated keys: one INSERT per row so each result can report its key
+            keys = [self.session.execute(spec.model.__table__.insert(), row).inserted_primary_key[0] for row in rows]
+        if spec.model is Approver:
+            for row in rows:
+                add_approver_node(self.session, row['emp_id'], row['manager_emp_id'])
+        return [{'key': key} for key in keys]
+
+    def update(self, table, spec, ops):
+        values = parse_fields(spec, ops[0].data, ops[0].index, partial=True)
+        column = key_column(spec)
+        if column.key in values:
+            raise BatchError(ops[0].index, f'{column.key} cannot be changed')
+        check_foreign_keys(self.session, spec, ops[:1], [values])
+        require_keys(self.session, spec, table, ops)
+        keys = list(dict.fromkeys(k for op in ops for k in op.keys))
+        if spec.model is Approver:
+            self.update_approvers(keys, values)
+        elif 'change_seq' in spec.model.__table__.c:
+            # Employee fields appear in attendance listings; see changes.py
+            values['change_seq'] = self.change_seq
+            if any(field in values for field in FILTERED_EMPLOYEE_FIELDS):
+                # Rows may leave filtered listings; clients get them back if they still match
+                tombstone_attendance_of(self.session, keys, self.change_seq)
+        # Attendance totals of re-grouped employees move between summary groups
+        regrouped = spec.model is Employee and ('vendor_name' in values or 'designation_id' in values)
+        groups = employee_groups(self.session, keys) if regrouped else set()
+        if values:
+            for chunk in chunks(keys):
+                self.session.execute(update(spec.model).where(column.in_(chunk)).values(**values))
+        if regrouped:
+            refresh_attendance_summary(self.session, groups | employee_groups(self.session, keys))
+        return [{'updated': len(op.keys)} for op in ops]
+
+    def update_approvers(self, keys, values):
+        if 'manager_emp_id' in values:
+            managers = {}
+            for chunk in chunks(keys):
+                managers.update(self.session.execute(
+                    select(Approver.emp_id, Approver.manager_emp_id).where(Approver.emp_id.in_(chunk))
+                ).all())
+            for emp_id in keys:
+                if managers[emp_id] != values['manager_emp_id']:
+                    move_approver_node(self.session, emp_id, values['manager_emp_id'])
+        password = values.pop('password', None)
+        if password:
+            # A separate salted hash per approver
+            for emp_id in keys:
+                self.session.execute(update(Approver).where(Approver.emp_id == emp_id)
+                                     .values(password_hash=hash_password(password)))
+
+    def delete(self, table, spec, ops):
+        require_keys(self.session, spec, table, ops)
+        keys = list(dict.fromkeys(k for op in ops for k in op.keys))
+        column = key_column(spec)
+        if table == 'employees':
+            tombstone_attendance_of(self.session, keys, self.change_seq)
+        for chunk in chunks(keys):
+            self.session.execute(delete(spec.model).where(column.in_(chunk)))
+        if spec.model is Approver:
+            for emp_id in keys:
+                remove_approver_node(self.session, emp_id)
+        return [{'deleted': len(op.keys)} for op in ops]
+
+
+def groups(ops):
+    """Split normalized ops into runs that can share one set-based statement."""
+    run = []
+    for op in ops:
+        first = run[0] if run else None
+        if first and (op.kind, op.table) == (first.kind, first.table) and (op.kind != 'update' or op.data == first.data):
+            run.append(op)
+        else:
+            if run:
+                yield run
+            run = [op]
+    if run:
+        yield run
+
+
+def apply_batch(session, operations):
+    """Apply ``operations`` in the caller's transaction.
+
+    Returns the per-operation results and the set of tables touched; raises
+    BatchError for the first operation that fails (the caller rolls back).
+    """
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError(None, f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+    ops = [normalize(index, op) for index, op in enumerate(operations)]
+    batch = Batch(session)
+    results = []
+    for run in groups(ops):
+        first = run[0]
+        try:
+            run_results = getattr(batch, first.kind)(first.table, TABLES[first.table], run)
+        except IntegrityError as e:
+            raise BatchError(first.index, f'Constraint violated: {e.orig}', 409)
+        except ValueError as e:
+            # Approver moves that would create a cycle
+            raise BatchError(first.index, str(e))
+        results.extend({'index': op.index, 'op': op.kind, 'table': op.table, 'status': 'ok', **result}
+                       for op, result in zip(run, run_results))
+    return results, {op.table for op in ops}
+
@@ -0,0 +1,173 @@
+# bench.py
+"""
+Endpoint benchmark harness.
+Drives the real endpoints, either in-process through the Flask test client or
+over HTTP against a running server (--url), with a fixed number of requests
+per scenario at the given concurrency. Reports p50/p95/p99 latency, throughput
+and status codes per scenario, and writes them as JSON so runs can be diffed
+across commits. Point DATABASE_URL at a database filled by generate_data.py.
+Admission control (admission.py) would turn most of these requests into 429s,
+so it is off in-process; start a server under test with ADMISSION_CONTROL=off.
+
+Usage: python bench.py [--url http://127.0.0.1:8000] [--requests 200] [--concurrency 8]
+                       [--only employees,attendance-period] [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+APPROVER = 'A00001'
+PASSWORD = 'pass'
+
+# name -> (method, path, role, JSON body); role picks the bearer token
+SCENARIOS = {
+    'login': ('POST', '/api/login', None, {'username': APPROVER, 'password': PASSWORD}),
+    'vendors': ('GET', '/api/vendors', 'admin', None),
+    'employees': ('GET', '/api/employees?limit=100', 'admin', None),
+    'employees-approver': ('GET', '/api/employees?limit=100', 'approver', None),
+    'attendance-period': ('GET', '/api/monthly-attendance?year=2024&month=6&limit=100', 'admin', None),
+    'attendance-approver': ('GET', f'/api/monthly-attendance?approver_emp_id={APPROVER}&limit=100', 'admin', None),
+    'attendance-designation': ('GET', '/api/monthly-attendance?designation=Engineer&year=2024&limit=100',
+                               'admin', None),
+    'attendance-summary': ('GET', '/api/attendance-summary?year=2024&group_by=vendor_name', 'admin', None),
+    'export-csv': ('GET', '/api/monthly-attendance/export?year=2024&month=6&format=csv', 'admin', None),
+}
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] if samples else 0.0
+
+
+class TestClientTransport:
+    def __init__(self):
+        os.environ.setdefault('ADMISSION_CONTROL', 'off')
+        from app import app
+        self.client = app.test_client()
+
+    def request(self, method, path, headers, body):
+        response = self.client.open(path, method=method, headers=headers, json=body)
+        response.get_data()
+        # As a WSGI server would; runs call_on_close callbacks such as admission slot release
+        response.close()
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, headers, body):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {**headers, 'Content-Type': 'application/json'} if data else headers
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+
+def login(transport, username, password):
+    status, body = transport.request('POST', '/api/login', {}, {'username': username, 'password': password})
+    if status != 200:
+        raise SystemExit(f'login as {username} failed with {status}: {body}')
+    return body['token']
+
+
+def run_scenario(transport, method, path, headers, body, requests, concurrency):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        status, _ = transport.request(method, path, headers, body)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        'method': method,
+        'path': path,
+        'requests': requests,
+        'throughput_rps': round(requests / wall, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'statuses': statuses,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process test client')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per scenario')
+    parser.add_argument('--only', help='comma-separated scenario names')
+    parser.add_argument('--admin-password', default='admin')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    transport = HTTPTransport(args.url) if args.url else TestClientTransport()
+    tokens = {
+        'admin': login(transport, 'admin', args.admin_password),
+        'approver': login(transport, APPROVER, PASSWORD),
+    }
+    names = args.only.split(',') if args.only else list(SCENARIOS)
+    results = {}
+    for name in names:
+        method, path, role, body = SCENARIOS[name]
+        headers = {'Authorization': f'Bearer {tokens[role]}'} if role else {}
+        for _ in range(args.warmup):
+            transport.request(method, path, headers, body)
+        results[name] = result = run_scenario(transport, method, path, headers, body,
+                                              args.requests, args.concurrency)
+        print(f'{name:24} {result["throughput_rps"]:>8} req/s  p50 {result["p50_ms"]:>8} ms  '
+              f'p95 {result["p95_ms"]:>8} ms  p99 {result["p99_ms"]:>8} ms  {result["statuses"]}')
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'target': args.url or 'test-client',
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
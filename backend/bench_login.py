@@ -0,0 +1,83 @@
+# bench_login.py
+"""
+Login throughput benchmark.
+Fires concurrent approver logins at /api/login through the Flask test client
+against a throwaway SQLite database, while one thread keeps polling
+/api/vendors, and reports login throughput plus login and CRUD latency.
+Admission control is off unless ADMISSION_CONTROL is set.
+Tune the hasher through the usual env vars (PASSWORD_HASHER, ARGON2_*,
+BCRYPT_ROUNDS, HASH_WORKERS, HASH_QUEUE_LIMIT).
+
+Usage: python bench_login.py [logins] [concurrency]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+# All logins come from one address; measure hashing, not the login rate limits
+os.environ.setdefault('ADMISSION_CONTROL', 'off')
+
+from app import app  # noqa: E402  (DATABASE_URL and ADMISSION_CONTROL must be set first)
+from db import engine, Session  # noqa: E402
+from models import Base, Approver, Vendor  # noqa: E402
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] if samples else 0.0
+
+
+def main(logins=200, concurrency=16):
+    Base.metadata.create_all(engine)
+    session = Session()
+    session.add(Vendor(vendor_name='Acme Corp'))
+    for i in range(concurrency):
+        approver = Approver(emp_id=f'A{i:03d}', name=f'Approver {i}', email=f'a{i}@acme.com',
+                            manager_emp_id='M001', manager_name='Mary Manager', manager_email='mary@acme.com')
+        approver.set_password('pass')
+        session.add(approver)
+    session.commit()
+    Session.remove()
+
+    client = app.test_client()
+    admin_token = client.post('/api/login', json={'username': 'admin', 'password': 'admin'}).get_json()['token']
+    statuses = {}
+    login_times = []
+    crud_times = []
+    done = threading.Event()
+
+    def login(i):
+        start = time.perf_counter()
+        response = client.post('/api/login', json={'username': f'A{i % concurrency:03d}', 'password': 'pass'})
+        login_times.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def poll_crud():
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/vendors', headers={'Authorization': f'Bearer {admin_token}'})
+            crud_times.append(time.perf_counter() - start)
+
+    poller = threading.Thread(target=poll_crud)
+    poller.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    poller.join()
+
+    print(f'{logins} logins, concurrency {concurrency}: {logins / elapsed:.1f} logins/s over {elapsed:.2f}s')
+    print(f'status codes: {statuses}')
+    print('login ms  p50 {:.1f}  p95 {:.1f}  p99 {:.1f}'.format(
+        *(percentile(login_times, p) * 1000 for p in (50, 95, 99))))
+    print('vendors ms p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  ({} requests during the burst)'.format(
+        *(percentile(crud_times, p) * 1000 for p in (50, 95, 99)), len(crud_times)))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,56 @@
+# billing_calendar.py
+"""
+Billing period boundaries derived from BillingCycleRule.start_day.
+A period for (year, month) runs from start_day of that month up to (not
+including) start_day of the next month. A start_day past the end of a short
+month is clamped to the month's last day, so a rule starting on the 31st
+begins on Feb 28/29.
+"""
+import calendar
+import datetime
+from functools import lru_cache
+
+
+def _clamped(year, month, day):
+    return datetime.date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+@lru_cache(maxsize=4096)
+def billing_period(start_day, year, month):
+    """Return ``(period_start, period_end)`` for a rule's ``start_day`` in ``year``/``month``."""
+    next_year, next_month = (year, month + 1) if month < 12 else (year + 1, 1)
+    return _clamped(year, month, start_day), _clamped(next_year, next_month, start_day)
+
+
+def ineligibility_reasons(rows):
+    """Check a batch of attendance rows against joining and resignation dates.
+
+    ``rows`` yields ``(start_day, year, month, doj, resignation_date,
+    payable_days, leaves_taken)`` tuples; a missing start_day means the 1st.
+    Returns one entry per row: None when the row's billing period overlaps the
+    employment and both day counts are whole numbers that fit in the period,
+    otherwise the reason it does not. Period boundaries are computed once per
+    distinct (start_day, year, month).
+    """
+    reasons = []
+    for start_day, year, month, doj, resignation_date, payable_days, leaves_taken in rows:
+        if not isinstance(year, int) or not isinstance(month, int) or not 1 <= month <= 12:
+            reasons.append('year and month must be integers with month between 1 and 12')
+            continue
+        period_start, period_end = billing_period(start_day or 1, year, month)
+        days = (period_end - period_start).days
+        if period_end <= doj:
+            reasons.append('Billing period ends before date of joining')
+        elif resignation_date and period_start > resignation_date:
+            reasons.append('Billing period starts after resignation date')
+        elif not _day_count(payable_days, days):
+            reasons.append(f'payable_days must be a whole number between 0 and {days}')
+        elif not _day_count(leaves_taken, days):
+            reasons.append(f'leaves_taken must be a whole number between 0 and {days}')
+        else:
+            reasons.append(None)
+    return reasons
+
+
+def _day_count(value, days):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= days
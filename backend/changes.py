@@ -0,0 +1,47 @@
+# changes.py
+"""
+Change sequence for delta sync.
+Writers take the next value of the single-row change_counter once per
+transaction and stamp it on every attendance or employee row they touch;
+rows leaving a listing leave an attendance_tombstone behind. The UPDATE
+holds the counter's row lock until commit, so sequence values become visible
+in commit order and a client that has seen everything up to N never misses a
+row stamped N or lower. Writers to these tables serialize on that lock.
+"""
+from sqlalchemy import select, update
+from models import ChangeCounter, AttendanceTombstone, MonthlyAttendance
+
+counter = ChangeCounter.__table__
+# Employee columns the attendance listings filter on; changing one can move rows out of a listing
+FILTERED_EMPLOYEE_FIELDS = ('vendor_name', 'designation_id', 'resigned')
+# Employees per IN (...) list
+CHUNK_SIZE = 1000
+
+
+def next_change_seq(session):
+    """Allocate the change sequence value for the current transaction; call once per transaction."""
+    session.execute(update(counter).where(counter.c.id == 1).values(value=counter.c.value + 1))
+    return current_change_seq(session)
+
+
+def current_change_seq(session):
+    """Highest change sequence value committed so far."""
+    return session.execute(select(counter.c.value).where(counter.c.id == 1)).scalar_one()
+
+
+def record_tombstones(session, rows, change_seq):
+    """Insert tombstones for ``rows`` (attendance_id, emp_id, approver_emp_id, year, month dicts)."""
+    if rows:
+        session.execute(AttendanceTombstone.__table__.insert(),
+                        [{**row, 'change_seq': change_seq} for row in rows])
+
+
+def tombstone_attendance_of(session, emp_ids, change_seq):
+    """Insert tombstones for every attendance row of ``emp_ids``, e.g. before they are deleted."""
+    emp_ids = list(emp_ids)
+    for start in range(0, len(emp_ids), CHUNK_SIZE):
+        rows = session.execute(select(
+            MonthlyAttendance.id.label('attendance_id'), MonthlyAttendance.emp_id, MonthlyAttendance.approver_emp_id,
+            MonthlyAttendance.year, MonthlyAttendance.month
+        ).where(MonthlyAttendance.emp_id.in_(emp_ids[start:start + CHUNK_SIZE]))).all()
+        record_tombstones(session, [row._asdict() for row in rows], change_seq)
@@ -0,0 +1,154 @@
+# check_query_plans.py
+"""
+Query-plan regression check for the attendance and employee list filters.
+Runs EXPLAIN for every combination of the filters GET /api/monthly-attendance
+and GET /api/employees support (ATTENDANCE_FILTERS, EMPLOYEE_FILTERS), plus the
+approver org joins, and fails if any of them falls back to a full table scan,
+except the unselective combinations listed in UNSELECTIVE with their expected
+scans. tests/test_query_plans.py runs the same
+checks under pytest.
+
+Usage: python check_query_plans.py                  # fresh in-memory SQLite schema
+       python check_query_plans.py <DATABASE_URL>   # e.g. a scratch Postgres database
+"""
+import itertools
+import json
+import sys
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from werkzeug.datastructures import MultiDict
+from models import Base, Vendor, Designation, Employee, MonthlyAttendance, ApproverClosure
+from app import (monthly_attendance_query, employees_query, keyset_query, under_manager, coerce_arg,
+                 designation_ids, ATTENDANCE_COLUMNS, ATTENDANCE_FILTERS, EMPLOYEE_COLUMNS, EMPLOYEE_FILTERS)
+
+# One sample value per filter of GET /api/monthly-attendance (ATTENDANCE_FILTERS)
+# and GET /api/employees (EMPLOYEE_FILTERS), as they arrive in the query string
+ATTENDANCE_SAMPLES = {
+    'emp_id': 'E001',
+    'approver_emp_id': 'A001',
+    'year': '2024',
+    'month': '3',
+    'vendor_name': 'Acme Corp',
+    'designation': 'Engineer',
+    'resigned': 'false',
+}
+EMPLOYEE_SAMPLES = {
+    'location': 'NYC',
+    'vendor_name': 'Acme Corp',
+    'approver_emp_id': 'A001',
+    'billing_rule_id': 'BR1',
+    'designation_id': '1',
+    'resigned': 'false',
+}
+
+# Combinations too unselective to justify an index of their own, with the
+# tables they are expected to scan (on SQLite; elsewhere they may scan less).
+# Every other combination must not scan any table.
+UNSELECTIVE = {
+    ('monthly-attendance', ('month',)): {'monthly_attendance'},
+    ('monthly-attendance', ('resigned',)): {'monthly_attendance'},
+    ('monthly-attendance', ('month', 'resigned')): {'monthly_attendance'},
+    ('employees', ('resigned',)): {'employee'},
+}
+
+
+def combinations(filters):
+    for n in range(1, len(filters) + 1):
+        yield from itertools.combinations(filters, n)
+
+def attendance_cases():
+    for combo in combinations(ATTENDANCE_FILTERS):
+        yield combo, lambda session, combo=combo: keyset_query(
+            monthly_attendance_query(session, MultiDict({k: ATTENDANCE_SAMPLES[k] for k in combo})),
+            ATTENDANCE_COLUMNS, list(ATTENDANCE_COLUMNS), 'id'
+        )
+
+def employee_cases():
+    for combo in combinations(EMPLOYEE_FILTERS):
+        def build(session, combo=combo):
+            # As list_response applies EMPLOYEE_FILTERS
+            query = employees_query(session)
+            for name in combo:
+                column = EMPLOYEE_COLUMNS[name]
+                query = query.filter(column == coerce_arg(column, EMPLOYEE_SAMPLES[name]))
+            return keyset_query(query, EMPLOYEE_COLUMNS, list(EMPLOYEE_COLUMNS), 'emp_id')
+        yield combo, build
+
+def org_cases():
+    yield ('employees',), lambda session: keyset_query(
+        employees_query(session).join(ApproverClosure, under_manager(Employee.approver_emp_id, 'M001')),
+        EMPLOYEE_COLUMNS, list(EMPLOYEE_COLUMNS), 'emp_id'
+    )
+    yield ('monthly-attendance', 'year'), lambda session: keyset_query(
+        monthly_attendance_query(session, MultiDict({'year': '2024'})).join(
+            ApproverClosure, under_manager(MonthlyAttendance.approver_emp_id, 'M001')),
+        ATTENDANCE_COLUMNS, list(ATTENDANCE_COLUMNS), 'id'
+    )
+
+def full_scans(session, query):
+    """Return the tables ``query`` reads with a full scan."""
+    dialect = session.bind.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'sqlite':
+        plan = [row[3] for row in session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+        return [step.split()[1] for step in plan if step.startswith('SCAN ')]
+    plan = session.execute(text('EXPLAIN (FORMAT JSON) ' + sql)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+def all_cases():
+    """(endpoint, filter names, query builder) for every checked combination."""
+    for endpoint, cases in (('monthly-attendance', attendance_cases()), ('employees', employee_cases()),
+                            ('approver org', org_cases())):
+        for combo, build in cases:
+            yield endpoint, combo, build
+
+def plan_problem(session, endpoint, combo, build):
+    """Why the plan of one case is wrong, or None if it scans only what UNSELECTIVE expects."""
+    scans = set(full_scans(session, build(session)))
+    expected = UNSELECTIVE.get((endpoint, combo), set())
+    if scans - expected:
+        return f'full scan of {", ".join(sorted(scans - expected))}'
+    if session.bind.dialect.name == 'sqlite' and scans != expected:
+        return f'expected a full scan of {", ".join(sorted(expected))}; update UNSELECTIVE'
+    return None
+
+def plan_session(database_url):
+    """Session on ``database_url`` set up for plan checks; an SQLite schema is created if needed."""
+    engine = create_engine(database_url)
+    if engine.dialect.name == 'sqlite':
+        Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    if not designation_ids(session, ATTENDANCE_SAMPLES['designation']):
+        # The designation filter resolves names to ids first; without a match its IN list is empty
+        session.merge(Vendor(vendor_name=ATTENDANCE_SAMPLES['vendor_name']))
+        session.add(Designation(designation=ATTENDANCE_SAMPLES['designation'],
+                                vendor_name=ATTENDANCE_SAMPLES['vendor_name']))
+        session.commit()
+    if engine.dialect.name == 'postgresql':
+        # Tiny scratch tables are cheaper to seq-scan; ask whether an index path exists at all
+        session.execute(text('SET enable_seqscan = off'))
+    return session
+
+def main(database_url):
+    session = plan_session(database_url)
+    failures = 0
+    for endpoint, combo, build in all_cases():
+        problem = plan_problem(session, endpoint, combo, build)
+        if problem:
+            failures += 1
+            print(f'FAIL {endpoint} [{", ".join(combo)}]: {problem}')
+    session.close()
+    print(f'{failures} filter combination(s) have an unexpected plan.' if failures else 'All filter combinations use indexes.')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else 'sqlite://'))
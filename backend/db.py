@@ -0,0 +1,194 @@
+# db.py
+"""
+Engine and session setup for the Flask app.
+Pool sizing, pre-ping, recycling and the statement timeout come from config.Config.
+
+Reads can be split off to replicas (Config.DATABASE_REPLICA_URLS). A session
+whose ``info['read_only']`` is set (app.py sets it for GET requests) reads
+from a healthy replica that is no more than REPLICA_MAX_LAG_SECONDS behind;
+anything else, and every write, goes to the primary ``engine``.
+"""
+import logging
+import random
+import threading
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session as OrmSession, sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
+from config import Config
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def create_db_engine(url, config=Config):
+    """Create an engine with the pool settings from ``config``."""
+    if url.startswith('sqlite'):
+        # SQLite keeps SQLAlchemy's default pool; there is no server to exhaust
+        return create_engine(url)
+    connect_args = {}
+    if url.startswith('postgresql') and config.DB_STATEMENT_TIMEOUT_MS:
+        connect_args['options'] = f'-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}'
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def pool_stats(engine):
+    """Snapshot of connection pool usage for ``engine``."""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._wait_lock:
+            stats.update({
+                'checkouts': pool.wait_count,
+                'wait_seconds_total': round(pool.wait_total, 6),
+                'wait_seconds_max': round(pool.wait_max, 6),
+                'wait_seconds_avg': round(pool.wait_total / pool.wait_count, 6) if pool.wait_count else 0.0,
+            })
+    return stats
+
+
+logger = logging.getLogger('attendance.db')
+
+# Streaming replica behind its upstream; 0 when it has replayed everything received
+PG_REPLAY_LAG = text("""
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+""")
+CHANGE_COUNTER = text('SELECT value FROM change_counter WHERE id = 1')
+
+
+class ReplicaSet:
+    """Replica engines with a periodically refreshed health and lag check."""
+
+    def __init__(self, primary, engines, max_lag, interval):
+        self.primary = primary
+        self.engines = engines
+        self.max_lag = max_lag
+        self.interval = interval
+        self._lock = threading.Lock()
+        # engine -> (checked at, lag in seconds or None while unreachable)
+        self._status = {engine: (float('-inf'), None) for engine in engines}
+        for engine in engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        # Stop routing to a replica that dropped a connection until its next check
+        if context.is_disconnect:
+            self._status[context.engine] = (time.monotonic(), None)
+
+    def lag(self, engine):
+        """Seconds ``engine`` is behind the primary.
+
+        Postgres standbys report their replay delay. Anything else (say a copy
+        of the SQLite file for local testing) is compared on the attendance and
+        employee change sequence (changes.py): level is 0, behind is infinite.
+        """
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql' and connection.execute(text('SELECT pg_is_in_recovery()')).scalar():
+                return float(connection.execute(PG_REPLAY_LAG).scalar() or 0)
+            replica_seq = connection.execute(CHANGE_COUNTER).scalar()
+        with self.primary.connect() as connection:
+            primary_seq = connection.execute(CHANGE_COUNTER).scalar()
+        return 0.0 if replica_seq >= primary_seq else float('inf')
+
+    def current_lag(self, engine):
+        checked_at, lag = self._status[engine]
+        # One thread refreshes a stale status; the others keep using the last one
+        if time.monotonic() - checked_at >= self.interval and self._lock.acquire(blocking=False):
+            try:
+                try:
+                    lag = self.lag(engine)
+                except Exception:
+                    logger.warning('Replica %s is unavailable', engine.url, exc_info=True)
+                    lag = None
+                self._status[engine] = (time.monotonic(), lag)
+            finally:
+                self._lock.release()
+        return lag
+
+    def choose(self):
+        """A random replica within the lag limit, or None to read from the primary."""
+        usable = []
+        for engine in self.engines:
+            lag = self.current_lag(engine)
+            if lag is not None and lag <= self.max_lag:
+                usable.append(engine)
+        return random.choice(usable) if usable else None
+
+    def stats(self):
+        return [
+            {'url': str(engine.url), 'lag_seconds': self._status[engine][1], **pool_stats(engine)}
+            for engine in self.engines
+        ]
+
+    def dispose(self, close=True):
+        for engine in self.engines:
+            engine.dispose(close=close)
+
+
+class RoutingSession(OrmSession):
+    """Session that reads from a replica while ``info['read_only']`` is set.
+
+    The replica is picked once per session, so all reads in a request see the
+    same database. A flush or an INSERT/UPDATE/DELETE clears the flag: the
+    write and everything after it in the session use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get('read_only'):
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['read_only'] = False
+            else:
+                if 'replica' not in self.info:
+                    self.info['replica'] = replicas.choose()
+                if self.info['replica'] is not None:
+                    return self.info['replica']
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+engine = create_db_engine(Config.SQLALCHEMY_DATABASE_URI)
+replicas = ReplicaSet(
+    engine,
+    [create_db_engine(url) for url in Config.DATABASE_REPLICA_URLS],
+    max_lag=Config.REPLICA_MAX_LAG_SECONDS,
+    interval=Config.REPLICA_CHECK_INTERVAL,
+)
+
+# One session per thread/request; app.py removes it in teardown_appcontext
+Session = scoped_session(sessionmaker(bind=engine, class_=RoutingSession))
@@ -0,0 +1,269 @@
+# employee_directory.py
+"""
+Process-local directory of employees and the master keys they reference.
+Built from one bulk query and kept as __slots__ records with interned
+strings and dates, indexed by emp_id, approver_emp_id and vendor_name, so
+approver-scoped employee listings and the foreign-key checks in add_employee
+need no database round trip. Attendance submission reads employees in its own
+transaction instead, since it writes what it reads.
+
+Freshness: mutation handlers in this process call refresh_employees() or
+expire(). Changes made by other processes are picked up every
+DIRECTORY_REFRESH_SECONDS by a background refresh: employees with a newer
+change_seq are reloaded, master keys are reloaded (they are small), and a row
+count mismatch or DIRECTORY_MAX_AGE_SECONDS triggers a full rebuild. Reference
+checks that miss fall back to the database, so a stale directory never rejects
+a valid key. Listings that must not lag a write by more than
+DIRECTORY_REFRESH_SECONDS check is_current() and read the database otherwise.
+"""
+import bisect
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import select, func, exists
+from models import Employee, Vendor, Location, Approver, BillingCycleRule, Designation
+
+logger = logging.getLogger('attendance.directory')
+
+DIRECTORY_REFRESH_SECONDS = float(os.getenv('DIRECTORY_REFRESH_SECONDS', '15'))
+DIRECTORY_MAX_AGE_SECONDS = float(os.getenv('DIRECTORY_MAX_AGE_SECONDS', '600'))
+FETCH_CHUNK_SIZE = 5000
+
+EMPLOYEE_FIELDS = ('emp_id', 'name', 'gender', 'state', 'location', 'vendor_name', 'approver_emp_id',
+                   'billing_rule_id', 'designation_id', 'dob', 'doj', 'resignation_date', 'resigned')
+# Low-cardinality string columns shared across records through sys.intern
+INTERNED_FIELDS = ('gender', 'state', 'location', 'vendor_name', 'approver_emp_id', 'billing_rule_id')
+# Request fields checked by references(), and the key column each must exist in
+REFERENCES = {
+    'location': Location.location,
+    'vendor_name': Vendor.vendor_name,
+    'approver_emp_id': Approver.emp_id,
+    'billing_rule_id': BillingCycleRule.rule_id,
+    'designation_id': Designation.designation_id,
+}
+
+
+class EmployeeRecord:
+    """One employee row; records are replaced, never mutated, once published."""
+
+    __slots__ = EMPLOYEE_FIELDS
+
+    def __init__(self, values):
+        for field, value in zip(EMPLOYEE_FIELDS, values):
+            setattr(self, field, value)
+
+
+class EmployeeDirectory:
+    """See the module docstring. All public methods are thread-safe."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()
+        self._built_at = None
+        self._checked_at = 0.0
+        # When the data now served was read from the database
+        self._snapshot_at = None
+        self._seen_seq = 0
+        self._dates = {}
+        self._by_id = {}
+        self._ids = []
+        self._by_approver = defaultdict(list)
+        self._by_vendor = defaultdict(list)
+        self._keys = {field: set() for field in REFERENCES}
+        self._start_days = {}
+        self._designations = {}
+
+    # Building and refreshing
+
+    def _record(self, row):
+        values = list(row)
+        for i, field in enumerate(EMPLOYEE_FIELDS):
+            value = values[i]
+            if field in INTERNED_FIELDS and value is not None:
+                values[i] = sys.intern(value)
+            elif isinstance(value, datetime.date):
+                values[i] = self._dates.setdefault(value, value)
+        return EmployeeRecord(values)
+
+    def _load_masters(self, connection):
+        keys = {field: set(connection.execute(select(column)).scalars()) for field, column in REFERENCES.items()}
+        start_days = dict(connection.execute(select(BillingCycleRule.rule_id, BillingCycleRule.start_day)).all())
+        designations = dict(connection.execute(select(Designation.designation_id, Designation.designation)).all())
+        with self._lock:
+            self._keys, self._start_days, self._designations = keys, start_days, designations
+
+    def rebuild(self):
+        """Reload everything with one bulk query and swap it in."""
+        columns = [getattr(Employee, field) for field in EMPLOYEE_FIELDS]
+        snapshot_at = time.monotonic()
+        with self.engine.connect() as connection:
+            seen_seq = connection.execute(select(func.coalesce(func.max(Employee.change_seq), 0))).scalar()
+            by_id = {}
+            by_approver = defaultdict(list)
+            by_vendor = defaultdict(list)
+            self._dates = {}
+            result = connection.execution_options(stream_results=True).execute(
+                select(*columns).order_by(Employee.emp_id)
+            )
+            for row in result.yield_per(FETCH_CHUNK_SIZE):
+                record = self._record(row)
+                by_id[record.emp_id] = record
+                # Rows arrive ordered by emp_id, so the index lists come out sorted
+                by_approver[record.approver_emp_id].append(record.emp_id)
+                by_vendor[record.vendor_name].append(record.emp_id)
+            self._load_masters(connection)
+        with self._lock:
+            self._by_id, self._by_approver, self._by_vendor = by_id, by_approver, by_vendor
+            self._ids = list(by_id)
+            self._seen_seq = seen_seq
+            self._snapshot_at = snapshot_at
+            self._built_at = self._checked_at = time.monotonic()
+
+    def _put(self, record):
+        old = self._by_id.get(record.emp_id)
+        if old is None:
+            bisect.insort(self._ids, record.emp_id)
+        else:
+            self._unindex(old)
+        self._by_id[record.emp_id] = record
+        bisect.insort(self._by_approver[record.approver_emp_id], record.emp_id)
+        bisect.insort(self._by_vendor[record.vendor_name], record.emp_id)
+
+    def _unindex(self, record):
+        for index, key in ((self._by_approver, record.approver_emp_id), (self._by_vendor, record.vendor_name)):
+            ids = index.get(key)
+            if ids and record.emp_id in ids:
+                ids.remove(record.emp_id)
+
+    def _drop(self, emp_id):
+        record = self._by_id.pop(emp_id, None)
+        if record is not None:
+            self._unindex(record)
+            position = bisect.bisect_left(self._ids, emp_id)
+            if position < len(self._ids) and self._ids[position] == emp_id:
+                del self._ids[position]
+
+    def _fetch(self, connection, condition):
+        columns = [getattr(Employee, field) for field in EMPLOYEE_FIELDS]
+        return [self._record(row) for row in connection.execute(select(*columns).where(condition))]
+
+    def refresh_employees(self, emp_ids):
+        """Reload ``emp_ids`` after this process changed them; ids no longer in the table are dropped."""
+        emp_ids = list(emp_ids)
+        if self._built_at is None:
+            return
+        with self.engine.connect() as connection:
+            records = []
+            for start in range(0, len(emp_ids), FETCH_CHUNK_SIZE):
+                records += self._fetch(connection, Employee.emp_id.in_(emp_ids[start:start + FETCH_CHUNK_SIZE]))
+        with self._lock:
+            found = {record.emp_id for record in records}
+            for record in records:
+                self._put(record)
+            for emp_id in emp_ids:
+                if emp_id not in found:
+                    self._drop(emp_id)
+
+    def expire(self):
+        """Have the next access run a refresh, e.g. after master data or bulk employee changes."""
+        self._checked_at = 0.0
+
+    def _refresh(self):
+        columns = [getattr(Employee, field) for field in EMPLOYEE_FIELDS]
+        snapshot_at = time.monotonic()
+        with self.engine.connect() as connection:
+            seen_seq = self._seen_seq
+            changed = connection.execute(select(*columns, Employee.change_seq).where(Employee.change_seq > seen_seq)).all()
+            count = connection.execute(select(func.count()).select_from(Employee)).scalar()
+            self._load_masters(connection)
+        with self._lock:
+            for row in changed:
+                self._put(self._record(row[:-1]))
+                seen_seq = max(seen_seq, row[-1])
+            self._seen_seq = seen_seq
+            self._checked_at = time.monotonic()
+            # Inserts that carry no change_seq and deletes only show up in the row count
+            if count != len(self._by_id):
+                return False
+            self._snapshot_at = snapshot_at
+            return True
+
+    def ensure_fresh(self):
+        """Build on first use, then start a background refresh when one is due."""
+        if self._built_at is None:
+            with self._refreshing:
+                if self._built_at is None:
+                    self.rebuild()
+            return
+        if time.monotonic() - self._checked_at < DIRECTORY_REFRESH_SECONDS or not self._refreshing.acquire(blocking=False):
+            return
+        # Readers keep using the current data until the refresh swaps in
+        threading.Thread(target=self._refresh_and_release, daemon=True).start()
+
+    def _refresh_and_release(self):
+        try:
+            if time.monotonic() - self._built_at >= DIRECTORY_MAX_AGE_SECONDS or not self._refresh():
+                self.rebuild()
+        except Exception:
+            logger.exception('Employee directory refresh failed')
+            self._checked_at = time.monotonic()
+        finally:
+            self._refreshing.release()
+
+    def is_current(self):
+        """Whether the data was read from the database less than DIRECTORY_REFRESH_SECONDS ago.
+
+        Starts a refresh when one is due, so a False answer does not last.
+        """
+        self.ensure_fresh()
+        return self._snapshot_at is not None and time.monotonic() - self._snapshot_at < DIRECTORY_REFRESH_SECONDS
+
+    # Lookups
+
+    def get(self, emp_id):
+        self.ensure_fresh()
+        return self._by_id.get(emp_id)
+
+    def records(self, emp_ids):
+        """Records for ``emp_ids`` in order, skipping ids removed since they were listed."""
+        for emp_id in emp_ids:
+            record = self._by_id.get(emp_id)
+            if record is not None:
+                yield record
+
+    def start_day(self, record):
+        """Billing cycle start day of the employee's rule, or None."""
+        return self._start_days.get(record.billing_rule_id)
+
+    def designation(self, record):
+        return self._designations.get(record.designation_id)
+
+    def emp_ids(self, approver_emp_id=None, vendor_name=None, after=None):
+        """Sorted emp_ids, optionally of one approver and/or vendor, after the ``after`` cursor."""
+        self.ensure_fresh()
+        with self._lock:
+            if approver_emp_id is not None:
+                ids = self._by_approver.get(approver_emp_id, [])
+            elif vendor_name is not None:
+                ids = self._by_vendor.get(vendor_name, [])
+            else:
+                ids = self._ids
+            start = bisect.bisect_right(ids, after) if after is not None else 0
+            return ids[start:]
+
+    def missing_references(self, values):
+        """The REFERENCES fields in ``values`` whose keys do not exist, re-checked against the database."""
+        self.ensure_fresh()
+        candidates = [field for field in REFERENCES if field in values and values[field] not in self._keys[field]]
+        if not candidates:
+            return []
+        with self.engine.connect() as connection:
+            return [
+                field for field in candidates
+                if not connection.execute(select(exists().where(REFERENCES[field] == values[field]))).scalar()
+            ]
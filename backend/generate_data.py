@@ -0,0 +1,163 @@
+# generate_data.py
+"""
+Synthetic data generator for load testing.
+Bulk-loads a deterministic dataset of the requested size with chunked
+executemany inserts (no ORM objects): vendors with their designations and
+billing rules, a tree of approvers (approver i reports to approver (i-1)//10),
+employees spread across them and one attendance row per active employee per
+month. Every approver's password is "pass". The attendance summary is rebuilt
+at the end.
+
+Usage: python generate_data.py [--vendors 500] [--approvers 5000] [--employees 200000]
+                               [--months 36] [--end 2024-12] [--seed 1] [--reset]
+"""
+import argparse
+import datetime
+import random
+import time
+from sqlalchemy import select
+from db import engine, Session
+from models import (Base, Vendor, Location, Approver, BillingCycleRule, Designation, Employee,
+                    MonthlyAttendance, AttendanceSummary)
+from hashing import hash_password
+from approver_tree import rebuild_approver_closure
+from attendance_history import ensure_year_partitions
+from attendance_summary import refresh_attendance_summary
+
+INSERT_CHUNK_SIZE = 10000
+DESIGNATIONS_PER_VENDOR = 5
+DESIGNATION_NAMES = ['Engineer', 'Senior Engineer', 'Analyst', 'Manager', 'Consultant', 'Technician',
+                     'Designer', 'Tester', 'Administrator', 'Architect']
+LOCATIONS = [('NYC', 'NY'), ('LA', 'CA'), ('SF', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'), ('Austin', 'TX'),
+             ('Seattle', 'WA'), ('Boston', 'MA'), ('Denver', 'CO'), ('Atlanta', 'GA'), ('Miami', 'FL'),
+             ('Phoenix', 'AZ')]
+# Approvers per manager in the generated hierarchy
+APPROVER_FANOUT = 10
+
+
+def insert_rows(session, model, rows):
+    """Insert an iterable of dicts in INSERT_CHUNK_SIZE executemany batches; returns the row count."""
+    table = model.__table__
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            session.execute(table.insert(), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        session.execute(table.insert(), chunk)
+        count += len(chunk)
+    session.commit()
+    return count
+
+
+def periods(months, end_year, end_month):
+    """The ``months`` (year, month) pairs ending at end_year/end_month, oldest first."""
+    index = end_year * 12 + end_month - 1
+    return [divmod(i, 12) for i in range(index - months + 1, index + 1)]
+
+
+def generate(session, vendors, approvers, employees, months, end_year, end_month, seed):
+    rng = random.Random(seed)
+    vendor_names = [f'Vendor {i:04d}' for i in range(vendors)]
+    counts = {}
+    counts['vendor'] = insert_rows(session, Vendor, ({'vendor_name': name} for name in vendor_names))
+    counts['location'] = insert_rows(session, Location, ({'location': l, 'state': s} for l, s in LOCATIONS))
+    counts['designation'] = insert_rows(session, Designation, (
+        {'vendor_name': name, 'designation': DESIGNATION_NAMES[(v + d) % len(DESIGNATION_NAMES)]}
+        for v, name in enumerate(vendor_names) for d in range(DESIGNATIONS_PER_VENDOR)
+    ))
+    designation_ids = {}
+    for designation_id, vendor_name in session.execute(
+            select(Designation.designation_id, Designation.vendor_name).order_by(Designation.designation_id)):
+        designation_ids.setdefault(vendor_name, []).append(designation_id)
+    counts['billing_cycle_rule'] = insert_rows(session, BillingCycleRule, (
+        {'rule_id': f'BR{v:04d}', 'start_day': rng.choice((1, 1, 1, 16, 21, 26, 31)), 'vendor_name': name}
+        for v, name in enumerate(vendor_names)
+    ))
+
+    # One hash shared by every approver; hashing thousands of passwords would dominate the run
+    password_hash = hash_password('pass')
+    approver_ids = [f'A{i:05d}' for i in range(approvers)]
+
+    def approver_row(i):
+        manager = (i - 1) // APPROVER_FANOUT if i else None
+        return {
+            'emp_id': approver_ids[i], 'name': f'Approver {i}', 'email': f'approver{i}@example.com',
+            'password_hash': password_hash,
+            'manager_emp_id': approver_ids[manager] if manager is not None else 'M00000',
+            'manager_name': f'Approver {manager}' if manager is not None else 'Chief Executive',
+            'manager_email': f'approver{manager}@example.com' if manager is not None else 'ceo@example.com',
+        }
+    counts['approver'] = insert_rows(session, Approver, (approver_row(i) for i in range(approvers)))
+    counts['approver_closure'] = rebuild_approver_closure(session)
+    session.commit()
+
+    all_periods = periods(months, end_year, end_month)
+    first_day = datetime.date(all_periods[0][0], all_periods[0][1] + 1, 1)
+    employee_rows = []
+    for i in range(employees):
+        v = rng.randrange(vendors)
+        location, state = rng.choice(LOCATIONS)
+        doj = first_day - datetime.timedelta(days=rng.randrange(3650))
+        resigned = rng.random() < 0.05
+        employee_rows.append({
+            'emp_id': f'E{i:07d}', 'name': f'Employee {i}', 'gender': rng.choice(('Male', 'Female')),
+            'state': state, 'location': location, 'vendor_name': vendor_names[v],
+            'approver_emp_id': approver_ids[rng.randrange(approvers)], 'billing_rule_id': f'BR{v:04d}',
+            'designation_id': rng.choice(designation_ids[vendor_names[v]]),
+            'dob': doj - datetime.timedelta(days=365 * 22 + rng.randrange(365 * 20)), 'doj': doj,
+            'resignation_date': first_day if resigned else None, 'resigned': resigned,
+        })
+    counts['employee'] = insert_rows(session, Employee, employee_rows)
+
+    def attendance_rows():
+        for employee in employee_rows:
+            if employee['resigned']:
+                continue
+            for year, month in all_periods:
+                leaves = rng.randrange(6)
+                yield {
+                    'emp_id': employee['emp_id'], 'approver_emp_id': employee['approver_emp_id'],
+                    'year': year, 'month': month + 1, 'working_days': 22 - leaves, 'leaves_taken': leaves,
+                }
+    counts['monthly_attendance'] = insert_rows(session, MonthlyAttendance, attendance_rows())
+
+    refresh_attendance_summary(session)
+    session.commit()
+    counts['attendance_summary'] = session.query(AttendanceSummary).count()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--vendors', type=int, default=500)
+    parser.add_argument('--approvers', type=int, default=5000)
+    parser.add_argument('--employees', type=int, default=200000)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--end', default='2024-12', help='last attendance period, YYYY-MM')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+    end_year, end_month = (int(part) for part in args.end.split('-'))
+
+    if args.reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_year_partitions(connection, {year for year, _ in periods(args.months, end_year, end_month)})
+    session = Session()
+    start = time.perf_counter()
+    counts = generate(session, args.vendors, args.approvers, args.employees, args.months,
+                      end_year, end_month, args.seed)
+    session.close()
+    elapsed = time.perf_counter() - start
+    for table, count in counts.items():
+        print(f'{table:20} {count:>10}')
+    print(f'{sum(counts.values())} rows in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
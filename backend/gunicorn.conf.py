@@ -0,0 +1,54 @@
+# gunicorn.conf.py
+"""
+Production server configuration.
+Prefork gunicorn with threaded workers: WEB_CONCURRENCY processes (default one
+per CPU) each running WEB_THREADS request threads. Keep DB_POOL_SIZE +
+DB_MAX_OVERFLOW at or above WEB_THREADS so threads never queue for a
+connection. Each worker opens its pool and fills its caches before accepting
+traffic (/readyz turns 200 once that is done); send HUP for a graceful reload
+and TERM for a graceful shutdown.
+
+Usage: gunicorn -c gunicorn.conf.py
+"""
+import multiprocessing
+import os
+import sys
+
+wsgi_app = 'app:app'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+threads = int(os.getenv('WEB_THREADS', '4'))
+# Importing the app in the master speeds up boot and shares memory, but HUP
+# then reloads configuration only; leave off to pick up new code on HUP
+preload_app = os.getenv('PRELOAD_APP', 'false').lower() == 'true'
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    # With preload_app the engine was built in the master; never share its connections
+    db = sys.modules.get('db')
+    if db is not None:
+        db.engine.dispose(close=False)
+        db.replicas.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Failures are retried in the background; /readyz stays 503 until warm-up succeeds
+    from app import warm_up_with_retry
+    warm_up_with_retry()
+
+
+def worker_exit(server, worker):
+    db = sys.modules.get('db')
+    if db is not None:
+        db.engine.dispose()
+        db.replicas.dispose()
@@ -0,0 +1,125 @@
+# hashing.py
+"""
+Password hashing for approver logins.
+New hashes use the scheme named by Config.PASSWORD_HASHER (argon2 or bcrypt) with
+the cost parameters from config.Config; hashes made with the other scheme or with
+outdated parameters are reported for rehash when they verify.
+Verification runs in a small bounded thread pool so a login burst cannot occupy
+every request worker.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from config import Config
+
+
+class HasherBusy(Exception):
+    """Raised when the verification pool and its queue are full."""
+
+
+class Argon2Hasher:
+    name = 'argon2'
+
+    def __init__(self, time_cost, memory_cost, parallelism):
+        self._ph = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+    def identify(self, stored_hash):
+        return stored_hash.startswith('$argon2')
+
+    def hash(self, password):
+        return self._ph.hash(password)
+
+    def verify(self, stored_hash, password):
+        try:
+            return self._ph.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, stored_hash):
+        return self._ph.check_needs_rehash(stored_hash)
+
+
+class BcryptHasher:
+    name = 'bcrypt'
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+
+    def identify(self, stored_hash):
+        return stored_hash.startswith(('$2a$', '$2b$', '$2y$'))
+
+    def hash(self, password):
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, stored_hash, password):
+        try:
+            return bcrypt.checkpw(password.encode(), stored_hash.encode())
+        except ValueError:
+            return False
+
+    def needs_rehash(self, stored_hash):
+        return int(stored_hash.split('$')[2]) != self.rounds
+
+
+HASHERS = {
+    'argon2': Argon2Hasher(Config.ARGON2_TIME_COST, Config.ARGON2_MEMORY_COST, Config.ARGON2_PARALLELISM),
+    'bcrypt': BcryptHasher(Config.BCRYPT_ROUNDS),
+}
+preferred = HASHERS[Config.PASSWORD_HASHER]
+
+_executor = ThreadPoolExecutor(max_workers=Config.HASH_WORKERS, thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(Config.HASH_WORKERS + Config.HASH_QUEUE_LIMIT)
+_dummy_hash = None
+
+
+def hash_password(password):
+    return preferred.hash(password)
+
+
+def identify(stored_hash):
+    """Return the hasher that produced ``stored_hash``, or None if it is not a known hash."""
+    for hasher in HASHERS.values():
+        if stored_hash and hasher.identify(stored_hash):
+            return hasher
+    return None
+
+
+def verify_password(stored_hash, password):
+    """Check ``password`` against ``stored_hash``.
+
+    Returns ``(ok, new_hash)``; ``new_hash`` is set when the password matched but
+    the stored hash should be replaced with one from the preferred hasher. A missing
+    or unrecognised ``stored_hash`` still costs one full verification, so unknown
+    users take as long to reject as wrong passwords.
+    """
+    global _dummy_hash
+    hasher = identify(stored_hash)
+    if hasher is None:
+        if _dummy_hash is None:
+            _dummy_hash = preferred.hash('dummy-password')
+        preferred.verify(_dummy_hash, password)
+        return False, None
+    if not hasher.verify(stored_hash, password):
+        return False, None
+    if hasher is not preferred or hasher.needs_rehash(stored_hash):
+        return True, preferred.hash(password)
+    return True, None
+
+
+def verify_password_bounded(stored_hash, password):
+    """Run verify_password on the hashing pool.
+
+    Raises HasherBusy instead of queueing once HASH_WORKERS verifications are
+    running and HASH_QUEUE_LIMIT more are waiting.
+    """
+    if not _slots.acquire(blocking=False):
+        raise HasherBusy()
+    try:
+        future = _executor.submit(verify_password, stored_hash, password)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result(timeout=Config.HASH_TIMEOUT)
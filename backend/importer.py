@@ -0,0 +1,250 @@
+# importer.py
+"""
+Bulk import of master data and employees from CSV/XLSX uploads.
+Rows are validated in a single streaming pass: required fields, value types,
+duplicate keys and foreign keys (checked against key sets preloaded once per
+import). Valid rows are inserted in batched executemany chunks; invalid rows
+are collected into an error report instead of aborting the import.
+"""
+import csv
+import datetime
+import os
+from sqlalchemy import select
+from models import Vendor, Location, Approver, BillingCycleRule, Designation, Employee
+from hashing import hash_password
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+# Errors kept per job for the report; the total count is always exact
+MAX_REPORTED_ERRORS = 10000
+
+
+def parse_str(value):
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+
+def parse_int(value):
+    if isinstance(value, int):
+        return value
+    value = parse_str(value)
+    return int(float(value)) if value is not None else None
+
+
+def parse_day(value):
+    value = parse_int(value)
+    if value is not None and not 1 <= value <= 31:
+        raise ValueError(f'{value} is not between 1 and 31')
+    return value
+
+
+def parse_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    value = parse_str(value)
+    return datetime.date.fromisoformat(value) if value is not None else None
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = parse_str(value)
+    if value is None:
+        return None
+    if value.lower() in ('true', '1', 'yes', 'y'):
+        return True
+    if value.lower() in ('false', '0', 'no', 'n'):
+        return False
+    raise ValueError(f'{value!r} is not a boolean')
+
+
+class TableSpec:
+    """How to validate and insert one table's import rows.
+
+    ``fields`` maps column names to parsers, ``required`` lists the columns that
+    must be present, ``foreign_keys`` maps a column to the key column it must
+    exist in, and ``key`` names the primary key checked for duplicates (None for
+    generated keys).
+    """
+
+    def __init__(self, model, fields, required, key=None, foreign_keys=None, transform=None):
+        self.model = model
+        self.fields = fields
+        self.required = required
+        self.key = key
+        self.foreign_keys = foreign_keys or {}
+        self.transform = transform
+
+
+def hash_approver_password(row):
+    row['password_hash'] = hash_password(row.pop('password'))
+    return row
+
+
+def default_resigned(row):
+    # executemany sends the key for every row, so the column default never applies
+    row['resigned'] = bool(row['resigned'])
+    return row
+
+
+TABLES = {
+    'vendors': TableSpec(Vendor, {'vendor_name': parse_str}, ['vendor_name'], key='vendor_name'),
+    'locations': TableSpec(
+        Location, {'location': parse_str, 'state': parse_str}, ['location', 'state'], key='location'
+    ),
+    'designations': TableSpec(
+        Designation,
+        {'designation': parse_str, 'vendor_name': parse_str},
+        ['designation', 'vendor_name'],
+        foreign_keys={'vendor_name': Vendor.vendor_name},
+    ),
+    'billing-cycle-rules': TableSpec(
+        BillingCycleRule,
+        {'rule_id': parse_str, 'start_day': parse_day, 'vendor_name': parse_str},
+        ['rule_id', 'start_day', 'vendor_name'],
+        key='rule_id',
+        foreign_keys={'vendor_name': Vendor.vendor_name},
+    ),
+    'approvers': TableSpec(
+        Approver,
+        {
+            'emp_id': parse_str, 'name': parse_str, 'email': parse_str, 'password': parse_str,
+            'manager_emp_id': parse_str, 'manager_name': parse_str, 'manager_email': parse_str,
+        },
+        ['emp_id', 'name', 'email', 'password', 'manager_emp_id', 'manager_name', 'manager_email'],
+        key='emp_id',
+        transform=hash_approver_password,
+    ),
+    'employees': TableSpec(
+        Employee,
+        {
+            'emp_id': parse_str, 'name': parse_str, 'gender': parse_str, 'state': parse_str,
+            'location': parse_str, 'vendor_name': parse_str, 'approver_emp_id': parse_str,
+            'billing_rule_id': parse_str, 'designation_id': parse_int, 'dob': parse_date,
+            'doj': parse_date, 'resignation_date': parse_date, 'resigned': parse_bool,
+        },
+        ['emp_id', 'name', 'gender', 'state', 'location', 'vendor_name', 'approver_emp_id',
+         'billing_rule_id', 'designation_id', 'dob', 'doj'],
+        key='emp_id',
+        foreign_keys={
+            'location': Location.location,
+            'vendor_name': Vendor.vendor_name,
+            'approver_emp_id': Approver.emp_id,
+            'billing_rule_id': BillingCycleRule.rule_id,
+            'designation_id': Designation.designation_id,
+        },
+        transform=default_resigned,
+    ),
+}
+
+
+def read_rows(path, filename):
+    """Yield one dict per data row of a CSV or XLSX file, keyed by the header row."""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [parse_str(h) for h in next(rows, ())]
+            for values in rows:
+                if any(v is not None for v in values):
+                    yield dict(zip(header, values))
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+
+
+class ImportReport:
+    """Counters and error report of one import run."""
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row, field, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'field': field, 'error': message})
+
+    def counts(self):
+        return {'processed': self.processed, 'inserted': self.inserted, 'errors': self.error_count}
+
+
+def foreign_key_errors(row, fk_keys):
+    """(field, message) for each foreign key in ``row`` missing from its key set in ``fk_keys``."""
+    return [
+        (field, f'{row[field]!r} does not exist')
+        for field, keys in fk_keys.items()
+        if row.get(field) is not None and row[field] not in keys
+    ]
+
+
+def validate_row(spec, raw, row_number, report, seen_keys, fk_keys):
+    """Parse and check one raw row; returns the insertable dict or None after recording errors."""
+    row = {}
+    ok = True
+    for field, parse in spec.fields.items():
+        try:
+            row[field] = parse(raw.get(field))
+        except (TypeError, ValueError) as e:
+            report.add_error(row_number, field, f'Invalid value: {e}')
+            ok = False
+    for field in spec.required:
+        # Fields that failed to parse were already reported
+        if field in row and row[field] is None:
+            report.add_error(row_number, field, f'{field} is required')
+            ok = False
+    if not ok:
+        return None
+    for field, message in foreign_key_errors(row, fk_keys):
+        report.add_error(row_number, field, message)
+        ok = False
+    if spec.key:
+        if row[spec.key] in seen_keys:
+            report.add_error(row_number, spec.key, f'{row[spec.key]!r} already exists')
+            ok = False
+        else:
+            seen_keys.add(row[spec.key])
+    if not ok:
+        return None
+    return spec.transform(row) if spec.transform else row
+
+
+def run_import(session, table_name, path, filename, progress=None):
+    """Validate and insert every row of ``path`` into ``table_name``, committing per batch.
+
+    ``progress`` is called with the running counts after each batch. Returns the
+    final counts plus the error report.
+    """
+    spec = TABLES[table_name]
+    table = spec.model.__table__
+    report = ImportReport()
+    # Preload key sets once; each row is then checked in memory
+    fk_keys = {field: set(session.execute(select(column)).scalars()) for field, column in spec.foreign_keys.items()}
+    seen_keys = set(session.execute(select(table.c[spec.key])).scalars()) if spec.key else set()
+    batch = []
+
+    def flush():
+        session.execute(table.insert(), batch)
+        session.commit()
+        report.inserted += len(batch)
+        batch.clear()
+        if progress:
+            progress(report.counts())
+
+    # Row 1 is the header
+    for row_number, raw in enumerate(read_rows(path, filename), start=2):
+        row = validate_row(spec, raw, row_number, report, seen_keys, fk_keys)
+        report.processed += 1
+        if row is not None:
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+    if batch:
+        flush()
+    return {**report.counts(), 'error_report': report.errors}
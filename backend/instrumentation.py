@@ -0,0 +1,192 @@
+# instrumentation.py
+"""
+Request timing, SQL instrumentation and metrics for the Flask app.
+Every request records its duration, SQL statement count and cumulative DB time
+per route, streamed responses once their body has been sent; statements slower
+than SLOW_QUERY_MS are logged. Metrics are
+exposed in Prometheus text format by GET /internal/metrics, and admins can add
+?_profile=1 to any request to get a profiler report instead of the response.
+Metrics are per process.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from functools import partial
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+# Prometheus scrapes with this bearer token; without one only direct loopback clients may scrape
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# Set by reverse proxies; a loopback request carrying one came from elsewhere
+PROXY_HEADERS = ('X-Forwarded-For', 'X-Real-IP', 'Forwarded')
+
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+logger = logging.getLogger('attendance')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label tuple."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            counts, total = self._series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ','.join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {counts[-1]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {counts[-1]}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ('method', 'route', 'status'), DURATION_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    'http_request_db_statements', 'SQL statements executed per request.', ('method', 'route'), STATEMENT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Cumulative SQL time per request.', ('method', 'route'), DURATION_BUCKETS
+)
+
+
+class RequestStats:
+    """SQL work of one request; shared with the close callback of a streamed response."""
+
+    __slots__ = ('statements', 'db_time', 'recorded')
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.recorded = False
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning('slow_query duration_ms=%.1f route=%s statement=%r',
+                       elapsed * 1000, _route() if has_request_context() else '-', statement[:500])
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _profile_report(profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(40)
+    return stream.getvalue()
+
+
+def _record(method, route, status, start, stats):
+    # Response close callbacks can run more than once
+    if stats.recorded:
+        return
+    stats.recorded = True
+    elapsed = time.perf_counter() - start
+    REQUEST_DURATION.observe((method, route, str(status)), elapsed)
+    REQUEST_STATEMENTS.observe((method, route), stats.statements)
+    REQUEST_DB_TIME.observe((method, route), stats.db_time)
+    logger.debug('request method=%s route=%s status=%s duration_ms=%.1f db_statements=%d db_ms=%.1f',
+                 method, route, status, elapsed * 1000, stats.statements, stats.db_time * 1000)
+
+
+def render_metrics(extra_lines=()):
+    lines = []
+    for histogram in (REQUEST_DURATION, REQUEST_STATEMENTS, REQUEST_DB_TIME):
+        lines.extend(histogram.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app, gauges=None):
+    """Register the timing hooks and GET /internal/metrics on ``app``.
+
+    Must run after the hook that loads JWT claims onto ``g``, since profiling is
+    admin-only. ``gauges`` is an optional callable returning extra
+    ``{metric_name: value}`` pairs to export, e.g. pool stats.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.request_stats = RequestStats()
+        g.profiler = None
+        if request.args.get('_profile') == '1' and g.get('claims') and g.claims.get('is_admin'):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        if g.get('profiler') is not None:
+            # Drain streamed bodies inside the profiler so their work is included
+            response.get_data()
+            g.profiler.disable()
+            report = _profile_report(g.profiler)
+            g.profiler = None
+            stats = g.request_stats
+            return Response(
+                f'{request.method} {request.full_path} -> {response.status_code}, '
+                f'{stats.statements} SQL statements, {stats.db_time * 1000:.1f} ms in DB\n\n{report}',
+                mimetype='text/plain'
+            )
+        if 'request_start' not in g:
+            return response
+        record = partial(_record, request.method, _route(), response.status_code, g.request_start, g.request_stats)
+        if response.is_streamed:
+            # Streamed bodies run their queries while the server sends them; the request context is gone by then
+            response.call_on_close(record)
+        else:
+            record()
+        return response
+
+    @app.route('/internal/metrics', methods=['GET'])
+    def metrics():
+        if METRICS_TOKEN:
+            if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+                return Response('forbidden\n', status=403, mimetype='text/plain')
+        elif request.remote_addr not in ('127.0.0.1', '::1') or any(h in request.headers for h in PROXY_HEADERS):
+            return Response('forbidden\n', status=403, mimetype='text/plain')
+        extra = []
+        for name, value in (gauges() if gauges else {}).items():
+            extra += [f'# TYPE {name} gauge', f'{name} {value}']
+        return Response(render_metrics(extra), mimetype='text/plain; version=0.0.4')
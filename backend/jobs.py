@@ -0,0 +1,176 @@
+# jobs.py
+"""
+Database-backed background jobs.
+Handlers register with @job_handler; enqueue() stores a job row and worker.py
+processes claim queued rows, run them and record the result. Failed attempts
+are retried with exponential backoff up to the handler's max_attempts, and jobs
+left running by a dead worker are requeued after JOB_TIMEOUT seconds (or failed
+once they have used up their attempts). No broker is needed: the jobs table in
+the application database is the queue.
+"""
+import datetime
+import logging
+import os
+import time
+import uuid
+from sqlalchemy import update
+from db import Session
+from models import Job
+
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '3600'))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', '5'))  # seconds, doubled per attempt
+
+HANDLERS = {}
+
+logger = logging.getLogger('attendance.jobs')
+
+
+def job_handler(kind, max_attempts=3):
+    """Register ``fn(payload, progress)`` as the handler for jobs of ``kind``.
+
+    ``progress`` takes a JSON-serialisable dict that is stored on the job for
+    status polling; the handler's return value becomes the job result.
+    """
+    def decorator(fn):
+        HANDLERS[kind] = (fn, max_attempts)
+        return fn
+    return decorator
+
+
+def utcnow():
+    return datetime.datetime.utcnow()
+
+
+def enqueue(kind, payload, created_by=None):
+    """Queue a job and return its id."""
+    _, max_attempts = HANDLERS[kind]
+    now = utcnow()
+    job = Job(
+        id=uuid.uuid4().hex, kind=kind, status='queued', payload=payload, attempts=0,
+        max_attempts=max_attempts, created_by=created_by, created_at=now, run_after=now,
+    )
+    session = Session()
+    try:
+        session.add(job)
+        session.commit()
+        return job.id
+    finally:
+        session.close()
+
+
+def job_status(job_id):
+    """Return the job as a dict, or None if it does not exist."""
+    session = Session()
+    try:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        return {
+            'job_id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'progress': job.progress,
+            'result': job.result,
+            'error': job.error,
+            'created_by': job.created_by,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        }
+    finally:
+        session.close()
+
+
+def _set(job_id, **values):
+    session = Session()
+    try:
+        session.execute(update(Job).where(Job.id == job_id).values(**values))
+        session.commit()
+    finally:
+        session.close()
+
+
+def requeue_stale():
+    """Requeue running jobs whose worker has not finished them within JOB_TIMEOUT.
+
+    Jobs that have used up their attempts are failed instead, so a job is
+    never started more than max_attempts times.
+    """
+    cutoff = utcnow() - datetime.timedelta(seconds=JOB_TIMEOUT)
+    stale = (Job.status == 'running', Job.started_at < cutoff)
+    session = Session()
+    try:
+        session.execute(
+            update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+            .values(status='failed', error=f'Timed out after {JOB_TIMEOUT} seconds', finished_at=utcnow())
+        )
+        session.execute(
+            update(Job).where(*stale, Job.attempts < Job.max_attempts)
+            .values(status='queued', locked_by=None, run_after=utcnow())
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+def claim(worker_id):
+    """Atomically take the oldest runnable queued job.
+
+    Returns (id, kind, payload, attempts, max_attempts), or None if nothing is runnable.
+    """
+    session = Session()
+    try:
+        candidates = session.query(Job.id).filter(
+            Job.status == 'queued', Job.run_after <= utcnow()
+        ).order_by(Job.run_after).limit(5).all()
+        for (job_id,) in candidates:
+            # Optimistic claim: only one worker's UPDATE matches status='queued'
+            claimed = session.execute(
+                update(Job).where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', locked_by=worker_id, started_at=utcnow(), attempts=Job.attempts + 1)
+            ).rowcount
+            session.commit()
+            if claimed:
+                job = session.get(Job, job_id)
+                return job.id, job.kind, job.payload, job.attempts, job.max_attempts
+        return None
+    finally:
+        session.close()
+
+
+def run_one(worker_id):
+    """Claim and run one job; returns False when the queue had nothing runnable."""
+    claimed = claim(worker_id)
+    if claimed is None:
+        return False
+    job_id, kind, payload, attempts, max_attempts = claimed
+    fn, _ = HANDLERS[kind]
+    try:
+        result = fn(payload, lambda progress: _set(job_id, progress=progress))
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        logger.exception('job %s (%s) failed on attempt %d', job_id, kind, attempts)
+        if attempts < max_attempts:
+            retry_at = utcnow() + datetime.timedelta(seconds=JOB_RETRY_DELAY * 2 ** (attempts - 1))
+            _set(job_id, status='queued', locked_by=None, error=error, run_after=retry_at)
+        else:
+            _set(job_id, status='failed', error=error, finished_at=utcnow())
+    else:
+        _set(job_id, status='succeeded', result=result, error=None, finished_at=utcnow())
+    finally:
+        Session.remove()
+    return True
+
+
+def work(worker_id, stop=None):
+    """Process jobs until ``stop`` (a threading/multiprocessing Event) is set."""
+    last_sweep = 0.0
+    while stop is None or not stop.is_set():
+        if time.monotonic() - last_sweep > 60:
+            requeue_stale()
+            last_sweep = time.monotonic()
+        if not run_one(worker_id):
+            time.sleep(JOB_POLL_INTERVAL)
@@ -0,0 +1,55 @@
+# json_provider.py
+"""
+Flask JSON provider backed by orjson.
+orjson serializes dates, datetimes and UUIDs natively (ISO 8601) and is several
+times faster than the stdlib encoder on large list payloads. When orjson is
+not installed the provider falls back to the stdlib encoder with the same
+date handling, so responses look identical either way.
+"""
+import datetime
+import decimal
+import json
+import uuid
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if orjson is None:
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+    if hasattr(value, '_asdict'):
+        return value._asdict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider using orjson when available; see the module docstring."""
+
+    sort_keys = True
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if kwargs.get('sort_keys', self.sort_keys) else 0)
+            return orjson.dumps(obj, default=_default, option=option).decode()
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj) + '\n', mimetype='application/json')
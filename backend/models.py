@@ -2,15 +2,23 @@ from sqlalchemy import (
     Column,
     String,
     Integer,
+    BigInteger,
     Date,
+    DateTime,
     Boolean,
+    JSON,
     ForeignKey,
     Computed,
-    CheckConstraint
+    CheckConstraint,
+    UniqueConstraint,
+    Index,
+    PrimaryKeyConstraint,
+    DDL,
+    event
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from argon2 import PasswordHasher
+from hashing import hash_password, verify_password
 
 Base = declarative_base()
 
@@ -40,6 +48,32 @@ class Designation(Base):
     vendor_name = Column(String, ForeignKey('vendor.vendor_name'), nullable=False)
     vendor = relationship('Vendor')
 
+# Substring search on designation names: a pg_trgm GIN index on Postgres and an
+# FTS5 trigram shadow table (kept in sync by triggers) on SQLite.
+event.listen(Designation.__table__, 'before_create', DDL(
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm'
+).execute_if(dialect='postgresql'))
+event.listen(Designation.__table__, 'after_create', DDL(
+    'CREATE INDEX ix_designation_trgm ON designation USING gin (designation gin_trgm_ops)'
+).execute_if(dialect='postgresql'))
+for statement in (
+    "CREATE VIRTUAL TABLE designation_fts USING fts5("
+    "designation, content='designation', content_rowid='designation_id', tokenize='trigram')",
+    "CREATE TRIGGER designation_fts_ai AFTER INSERT ON designation BEGIN "
+    "INSERT INTO designation_fts(rowid, designation) VALUES (new.designation_id, new.designation); END",
+    "CREATE TRIGGER designation_fts_ad AFTER DELETE ON designation BEGIN "
+    "INSERT INTO designation_fts(designation_fts, rowid, designation) "
+    "VALUES ('delete', old.designation_id, old.designation); END",
+    "CREATE TRIGGER designation_fts_au AFTER UPDATE ON designation BEGIN "
+    "INSERT INTO designation_fts(designation_fts, rowid, designation) "
+    "VALUES ('delete', old.designation_id, old.designation); "
+    "INSERT INTO designation_fts(rowid, designation) VALUES (new.designation_id, new.designation); END",
+):
+    event.listen(Designation.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Designation.__table__, 'before_drop', DDL(
+    'DROP TABLE IF EXISTS designation_fts'
+).execute_if(dialect='sqlite'))
+
 class Location(Base):
     __tablename__ = 'location'
     location = Column(String, primary_key=True)
@@ -58,15 +92,27 @@ class Approver(Base):
     manager_email = Column(String, nullable=False)
 
     def set_password(self, password: str):
-        ph = PasswordHasher()
-        self.password_hash = ph.hash(password)
+        self.password_hash = hash_password(password)
 
     def verify_password(self, password: str) -> bool:
-        ph = PasswordHasher()
-        try:
-            return ph.verify(self.password_hash, password)
-        except Exception:
-            return False
+        return verify_password(self.password_hash, password)[0]
+
+class ApproverClosure(Base):
+    """Transitive closure of the approver reporting tree; maintained by approver_tree.py.
+
+    One row per (ancestor, descendant) pair, including each node paired with
+    itself at depth 0. Managers who are not approvers themselves appear only as
+    ancestors.
+    """
+    __tablename__ = 'approver_closure'
+    ancestor_emp_id = Column(String, primary_key=True)
+    descendant_emp_id = Column(String, primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Ancestor lookups when a subtree is moved
+        Index('ix_approver_closure_descendant', 'descendant_emp_id'),
+    )
 
 class Employee(Base):
     __tablename__ = 'employee'
@@ -83,12 +129,26 @@ class Employee(Base):
     doj = Column(Date, nullable=False)
     resignation_date = Column(Date, nullable=True)
     resigned = Column(Boolean, default=False)
+    # Value of change_counter when the row last changed; see changes.py
+    change_seq = Column(BigInteger, nullable=False, server_default='0')
     location_rel = relationship('Location')
     vendor = relationship('Vendor')
     approver = relationship('Approver')
     billing_rule = relationship('BillingCycleRule')
     designation = relationship('Designation')
 
+    __table_args__ = (
+        # Approver-scoped listings and vendor/resigned attendance filters
+        Index('ix_employee_approver', 'approver_emp_id'),
+        Index('ix_employee_vendor_resigned', 'vendor_name', 'resigned'),
+        # Attendance search by designation filters on resolved designation_ids
+        Index('ix_employee_designation', 'designation_id'),
+        # Location and billing rule listing filters, and the foreign-key checks when one is deleted
+        Index('ix_employee_location', 'location'),
+        Index('ix_employee_billing_rule', 'billing_rule_id'),
+        Index('ix_employee_change_seq', 'change_seq'),
+    )
+
 class MonthlyAttendance(Base):
     __tablename__ = 'monthly_attendance'
     id = Column(Integer, primary_key=True)
@@ -100,14 +160,112 @@ class MonthlyAttendance(Base):
     leaves_taken = Column(Integer, nullable=False)
     loss_of_pay = Column(
         Integer,
-        Computed('GREATEST(leaves_taken - 2, 0)', persisted=True)
+        # CASE instead of GREATEST so the column also builds on SQLite
+        Computed('CASE WHEN leaves_taken > 2 THEN leaves_taken - 2 ELSE 0 END', persisted=True)
     )
+    change_seq = Column(BigInteger, nullable=False, server_default='0')
 
     __table_args__ = (
+        # Postgres partitions by year and needs it in the key; that key is added below
+        PrimaryKeyConstraint('id', name='monthly_attendance_pkey').ddl_if(
+            callable_=lambda ddl, target, bind, **kw: kw['dialect'].name != 'postgresql'
+        ),
         # Ensure one record per employee per period
+        UniqueConstraint('emp_id', 'year', 'month', name='uq_attendance_emp_period'),
+        # Period listings, optionally narrowed to one approver
+        Index('ix_attendance_period_approver', 'year', 'month', 'approver_emp_id'),
+        # Approver listings across periods
+        Index('ix_attendance_approver_period', 'approver_emp_id', 'year', 'month'),
+        # Delta sync: rows changed since a client's last token
+        Index('ix_attendance_change_seq', 'change_seq'),
         CheckConstraint('month BETWEEN 1 AND 12', name='ck_month_range'),
         CheckConstraint('year >= 2000', name='ck_year_valid'),
-        {'sqlite_autoincrement': True},
+        {'sqlite_autoincrement': True, 'postgresql_partition_by': 'RANGE (year)'},
     )
 
     employee = relationship('Employee')
+
+# Postgres: one partition per year (attendance_history.ensure_year_partitions) plus a default
+# partition for years that have none yet
+event.listen(MonthlyAttendance.__table__, 'after_create', DDL(
+    'ALTER TABLE monthly_attendance ADD CONSTRAINT monthly_attendance_pkey PRIMARY KEY (id, year)'
+).execute_if(dialect='postgresql'))
+event.listen(MonthlyAttendance.__table__, 'after_create', DDL(
+    'CREATE TABLE monthly_attendance_default PARTITION OF monthly_attendance DEFAULT'
+).execute_if(dialect='postgresql'))
+
+class AttendanceTombstone(Base):
+    """An attendance row that left a listing: deleted, or moved to another approver.
+
+    Keeps the row's old filter values so /api/monthly-attendance/changes can
+    tell the clients that were showing it.
+    """
+    __tablename__ = 'attendance_tombstone'
+    tombstone_id = Column(Integer, primary_key=True)
+    attendance_id = Column(Integer, nullable=False)
+    emp_id = Column(String, nullable=False)
+    approver_emp_id = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index('ix_attendance_tombstone_change_seq', 'change_seq'),
+    )
+
+class ChangeCounter(Base):
+    """Single-row counter behind the change_seq columns; see changes.py."""
+    __tablename__ = 'change_counter'
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False)
+
+event.listen(ChangeCounter.__table__, 'after_create', DDL(
+    'INSERT INTO change_counter (id, value) VALUES (1, 0)'
+))
+
+class CacheGeneration(Base):
+    """Single-row counter bumped when master data changes outside the web processes; see app.GenerationWatch."""
+    __tablename__ = 'cache_generation'
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False)
+
+event.listen(CacheGeneration.__table__, 'after_create', DDL(
+    'INSERT INTO cache_generation (id, value) VALUES (1, 0)'
+))
+
+class AttendanceSummary(Base):
+    """Per-period attendance totals; see attendance_summary.py."""
+    __tablename__ = 'attendance_summary'
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    vendor_name = Column(String, primary_key=True)
+    designation_id = Column(Integer, primary_key=True)
+    approver_emp_id = Column(String, primary_key=True)
+    headcount = Column(Integer, nullable=False)
+    working_days = Column(Integer, nullable=False)
+    leaves_taken = Column(Integer, nullable=False)
+    loss_of_pay = Column(Integer, nullable=False)
+
+class Job(Base):
+    """Background job row; see jobs.py."""
+    __tablename__ = 'job'
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # queued, running, succeeded, failed
+    payload = Column(JSON, nullable=False)
+    progress = Column(JSON)
+    result = Column(JSON)
+    error = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    created_by = Column(String)
+    created_at = Column(DateTime, nullable=False)
+    run_after = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    locked_by = Column(String)
+
+    __table_args__ = (
+        # Workers poll for the oldest runnable queued job
+        Index('ix_job_claim', 'status', 'run_after'),
+    )
@@ -0,0 +1,118 @@
+# response_compression.py
+"""
+Negotiated response compression.
+Picks the best encoding the client accepts among zstd, br and gzip (zstd and
+br only when the zstandard / brotli packages are installed) and compresses
+text responses: buffered bodies above COMPRESS_MIN_SIZE bytes, and streamed
+listings chunk by chunk as they are produced.
+"""
+import os
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoding
+    zstandard = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '5'))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain'}
+
+
+class GzipCompressor:
+    def __init__(self):
+        self._z = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush()
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self._z = brotli.Compressor(quality=COMPRESS_LEVEL)
+
+    def compress(self, data):
+        return self._z.process(data)
+
+    def flush(self):
+        return self._z.finish()
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self._z = zstandard.ZstdCompressor(level=COMPRESS_LEVEL).compressobj()
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush()
+
+
+# Server preference order
+ENCODINGS = {'zstd': ZstdCompressor, 'br': BrotliCompressor, 'gzip': GzipCompressor}
+if zstandard is None:
+    del ENCODINGS['zstd']
+if brotli is None:
+    del ENCODINGS['br']
+
+
+def negotiate(accept_encodings):
+    """Best supported encoding in the request's Accept-Encoding, or None."""
+    for encoding in ENCODINGS:
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def compressed_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Let the wrapped generator run its cleanup (e.g. closing the session) on disconnect
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_app(app):
+    """Register the after_request hook that compresses eligible responses.
+
+    Register before other after_request hooks so it runs last, on the final body.
+    """
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+        compressor = ENCODINGS[encoding]()
+        if response.is_streamed:
+            response.response = compressed_stream(response.response, compressor)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < COMPRESS_MIN_SIZE:
+                return response
+            response.set_data(compressor.compress(body) + compressor.flush())
+        response.headers['Content-Encoding'] = encoding
+        if response.headers.get('ETag') and not response.headers['ETag'].startswith('W/'):
+            # The compressed bytes differ from the identity representation
+            response.headers['ETag'] = 'W/' + response.headers['ETag']
+        return response
@@ -11,6 +11,7 @@ from models import Base, Vendor, Location, Approver, BillingCycleRule, Designati
 from datetime import date
 import datetime
 import bcrypt
+from approver_tree import rebuild_approver_closure
 
 load_dotenv()
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///attendance.db')
@@ -45,6 +46,8 @@ if __name__ == '__main__':
     a1 = Approver(emp_id='A001', name='Alice', email='alice@acme.com', password_hash=bcrypt.hashpw('pass'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'), manager_emp_id='M001', manager_name='Mary Manager', manager_email='mary@acme.com')
     a2 = Approver(emp_id='A002', name='Bob', email='bob@globex.com', password_hash=bcrypt.hashpw('pass'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'), manager_emp_id='M002', manager_name='Ben Boss', manager_email='ben@globex.com')
     session.add_all([a1, a2])
+    session.flush()
+    rebuild_approver_closure(session)
     session.commit()
 
     # Add sample designations
@@ -5,9 +5,11 @@ Usage: python setup_db.py
 """
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+import datetime
 import os
 from dotenv import load_dotenv
-from models import Base, Vendor, Location, Approver, BillingCycleRule, Designation, Employee
+from attendance_history import ensure_year_partitions
+from models import Base, Vendor, Location, Approver, BillingCycleRule, Designation, Employee, MonthlyAttendance, AttendanceSummary, Job, ApproverClosure, AttendanceTombstone, ChangeCounter, CacheGeneration
 
 load_dotenv()
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///attendance.db')
@@ -16,4 +18,8 @@ engine = create_engine(DATABASE_URL)
 if __name__ == '__main__':
     Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
+    # Postgres: yearly attendance partitions for recent and next year; see attendance_history.py
+    this_year = datetime.date.today().year
+    with engine.begin() as connection:
+        ensure_year_partitions(connection, range(this_year - 5, this_year + 2))
     print('Database tables created.')
@@ -0,0 +1,101 @@
+"""
+Shared fixtures: the Flask app on a throwaway SQLite database.
+db.py builds its engine from DATABASE_URL at import time, so the environment is
+set up here before anything from the backend is imported.
+"""
+import datetime
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+import pytest
+
+WORK_DIR = tempfile.mkdtemp(prefix='attendance-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(WORK_DIR, "attendance.db")}'
+os.environ['ATTENDANCE_ARCHIVE_DIR'] = os.path.join(WORK_DIR, 'archive')
+os.environ['ADMISSION_CONTROL'] = 'off'
+# One reverse proxy in front, as deployed; tests send X-Forwarded-For where the address matters
+os.environ['TRUSTED_PROXY_HOPS'] = '1'
+# Background reads would show up in the statement counts; tests call GenerationWatch.poll directly
+os.environ['CACHE_GENERATION_CHECK_SECONDS'] = '3600'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session as OrmSession  # noqa: E402
+from models import Base, Vendor, Location, Approver, BillingCycleRule, Designation, Employee  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    """The app's engine with a freshly created schema."""
+    from db import engine, Session
+    Session.remove()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Session.remove()
+
+
+@pytest.fixture
+def client(engine):
+    from app import app
+    return app.test_client()
+
+
+def bearer(username, is_admin):
+    from app import app
+    token = jwt.encode({
+        'username': username,
+        'is_admin': is_admin,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=5)
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def admin_headers():
+    return bearer('admin', True)
+
+
+@contextmanager
+def count_statements(engine):
+    """Collect every SQL statement ``engine`` sends while the block runs."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def seed_masters(engine):
+    with OrmSession(engine) as session:
+        session.add_all([Vendor(vendor_name='Acme Corp'), Vendor(vendor_name='Globex Inc'),
+                         Location(location='NYC', state='NY')])
+        session.add_all([
+            Approver(emp_id=emp_id, name=emp_id, email=f'{emp_id}@acme.com', password_hash='x',
+                     manager_emp_id='M001', manager_name='Mary', manager_email='mary@acme.com')
+            for emp_id in ('A001', 'A002')
+        ])
+        session.add_all([
+            BillingCycleRule(rule_id='BR1', start_day=1, vendor_name='Acme Corp'),
+            Designation(designation_id=1, designation='Engineer', vendor_name='Acme Corp'),
+            Designation(designation_id=2, designation='Analyst', vendor_name='Globex Inc'),
+        ])
+        session.commit()
+
+
+def seed_employees(engine, first, count):
+    with OrmSession(engine) as session:
+        session.add_all([
+            Employee(emp_id=f'E{n:05d}', name=f'Employee {n}', gender='Female', state='NY', location='NYC',
+                     vendor_name='Acme Corp', approver_emp_id='A001' if n % 2 else 'A002', billing_rule_id='BR1',
+                     designation_id=1, dob=datetime.date(1990, 1, 1), doj=datetime.date(2023, 1, 1), resigned=False)
+            for n in range(first, first + count)
+        ])
+        session.commit()
@@ -0,0 +1,37 @@
+from admission import LocalBuckets, LOGIN_ADDRESS_LIMITS, buckets
+
+
+def login_keys(app, username, address):
+    with app.test_request_context('/api/login', method='POST', json={'username': username},
+                                  environ_base={'REMOTE_ADDR': address}):
+        return buckets('login')
+
+
+def test_login_takes_address_bucket_before_account_bucket(client):
+    from app import app
+    keys = login_keys(app, 'A001', '10.0.0.1')
+    assert [key for key, _ in keys] == ['login_address:addr:10.0.0.1', 'login:login:A001']
+    assert keys[0][1] is LOGIN_ADDRESS_LIMITS
+
+
+def test_username_spray_from_one_address_runs_out(client):
+    from app import app
+    backend = LocalBuckets()
+    waits = []
+    for n in range(int(LOGIN_ADDRESS_LIMITS.burst) + 1):
+        key, limits = login_keys(app, f'user{n}', '10.0.0.1')[0]
+        waits.append(backend.take(key, limits.rate, limits.burst))
+    assert not any(waits[:-1]) and waits[-1] > 0
+    # Another address is unaffected
+    key, limits = login_keys(app, 'user0', '10.0.0.2')[0]
+    assert backend.take(key, limits.rate, limits.burst) == 0
+
+
+def test_login_address_is_the_forwarded_client(client, monkeypatch):
+    import admission
+    taken = []
+    monkeypatch.setattr(admission, 'ADMISSION_CONTROL', True)
+    monkeypatch.setattr(admission, 'buckets', lambda name: taken.extend(buckets(name)) or [])
+    client.post('/api/login', json={'username': 'nobody', 'password': 'x'},
+                headers={'X-Forwarded-For': '203.0.113.7'})
+    assert [key for key, _ in taken] == ['login_address:addr:203.0.113.7', 'login:login:nobody']
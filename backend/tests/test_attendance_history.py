@@ -0,0 +1,85 @@
+import json
+import os
+import pytest
+from werkzeug.datastructures import MultiDict
+from conftest import seed_masters, seed_employees
+
+
+def year_rows(session, year):
+    from app import ATTENDANCE_COLUMNS, monthly_attendance_query
+    from models import MonthlyAttendance
+    query = monthly_attendance_query(session, MultiDict({'year': year}))
+    return query.with_entities(*[column.label(f) for f, column in ATTENDANCE_COLUMNS.items()]).order_by(MonthlyAttendance.id)
+
+
+@pytest.fixture
+def attendance_2024(client, engine, admin_headers):
+    from app import employee_directory
+    seed_masters(engine)
+    seed_employees(engine, 1, 3)
+    employee_directory.rebuild()
+    from attendance_history import archive_path
+    result = client.post('/api/monthly-attendance', headers=admin_headers, json={'records': [
+        {'emp_id': f'E0000{n}', 'year': 2024, 'month': month, 'payable_days': 20, 'leaves_taken': 1}
+        for n in (1, 2, 3) for month in (1, 2)
+    ]}).get_json()
+    assert result['accepted'] == 6
+    yield
+    if os.path.exists(archive_path(2024)):
+        os.remove(archive_path(2024))
+
+
+def test_archive_year_moves_rows_to_the_archive(engine, attendance_2024):
+    from attendance_history import archive_year, archived_years
+    from db import Session
+    session = Session()
+    assert archive_year(session, 2024, year_rows(session, 2024)) == 6
+    assert 2024 in archived_years()
+    assert year_rows(Session(), 2024).count() == 0
+
+
+def test_archive_year_keeps_everything_when_rows_were_missed(engine, attendance_2024):
+    from attendance_history import archive_year, archive_path
+    from db import Session
+    session = Session()
+    # As if a submission committed after the rows were read
+    rows = year_rows(session, 2024).all()[1:]
+    with pytest.raises(RuntimeError, match='Archived 5 rows of 2024 but the table had 6'):
+        archive_year(session, 2024, rows)
+    assert not os.path.exists(archive_path(2024))
+    assert year_rows(Session(), 2024).count() == 6
+
+
+def test_archived_year_is_read_in_id_order_in_pages_and_exports(client, engine, admin_headers, attendance_2024):
+    from attendance_history import archive_year
+    from db import Session
+    session = Session()
+    expected = [row.id for row in year_rows(session, 2024) if row.month == 2]
+    archive_year(session, 2024, year_rows(session, 2024))
+
+    ids, cursor = [], None
+    while True:
+        query = '/api/monthly-attendance?year=2024&month=2&limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(query, headers=admin_headers)
+        ids += [row['id'] for row in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert ids == expected
+
+    export = client.get('/api/monthly-attendance/export?year=2024&month=2&format=ndjson', headers=admin_headers)
+    assert [json.loads(line)['id'] for line in export.get_data(as_text=True).splitlines()] == expected
+
+
+def test_changes_serve_an_archived_year_from_its_archive(client, engine, admin_headers, attendance_2024):
+    from attendance_history import archive_year
+    from db import Session
+    session = Session()
+    archive_year(session, 2024, year_rows(session, 2024))
+
+    snapshot = client.get('/api/monthly-attendance/changes?year=2024&month=1', headers=admin_headers).get_json()
+    assert [(row['emp_id'], row['month']) for row in snapshot['upserted']] == [
+        ('E00001', 1), ('E00002', 1), ('E00003', 1)]
+    delta = client.get(f'/api/monthly-attendance/changes?year=2024&since={snapshot["next"]}',
+                       headers=admin_headers).get_json()
+    assert delta == {'next': snapshot['next'], 'deleted': [], 'upserted': []}
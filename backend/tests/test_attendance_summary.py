@@ -0,0 +1,60 @@
+from sqlalchemy.orm import Session as OrmSession
+from conftest import count_statements, seed_masters, seed_employees
+
+
+def submit(client, headers, *records):
+    response = client.post('/api/monthly-attendance', headers=headers, json={'records': list(records)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def summary(client, headers):
+    return {
+        (row['vendor_name'], row['designation_id']): row['headcount']
+        for row in client.get('/api/attendance-summary?group_by=vendor_name,designation_id', headers=headers).get_json()
+    }
+
+
+def setup_attendance(client, engine, headers):
+    from app import employee_directory
+    seed_masters(engine)
+    seed_employees(engine, 1, 2)
+    employee_directory.rebuild()
+    result = submit(client, headers, *(
+        {'emp_id': emp_id, 'year': 2024, 'month': 3, 'payable_days': 20, 'leaves_taken': 1}
+        for emp_id in ('E00001', 'E00002')
+    ))
+    assert result['accepted'] == 2
+    assert summary(client, headers) == {('Acme Corp', 1): 2}
+
+
+def test_employee_update_moves_summary_totals(client, engine, admin_headers):
+    setup_attendance(client, engine, admin_headers)
+    response = client.put('/api/employees/E00001', headers=admin_headers,
+                          json={'vendor_name': 'Globex Inc', 'designation_id': 2})
+    assert response.status_code == 200
+    assert summary(client, admin_headers) == {('Acme Corp', 1): 1, ('Globex Inc', 2): 1}
+
+
+def test_batch_employee_update_moves_summary_totals(client, engine, admin_headers):
+    setup_attendance(client, engine, admin_headers)
+    response = client.post('/api/batch', headers=admin_headers, json={'operations': [
+        {'op': 'update', 'table': 'employees', 'keys': ['E00001', 'E00002'],
+         'data': {'vendor_name': 'Globex Inc', 'designation_id': 2}},
+    ]})
+    assert response.status_code == 200
+    assert summary(client, admin_headers) == {('Globex Inc', 2): 2}
+
+
+def test_group_refresh_finds_attendance_through_the_period_index(engine):
+    from attendance_summary import refresh_attendance_summary
+    groups = {(2024, 3, 'Acme Corp', 1, 'A001'), (2024, 4, 'Globex Inc', 2, 'A002')}
+    with OrmSession(engine) as session, count_statements(engine) as statements:
+        refresh_attendance_summary(session, groups)
+        [recompute] = [s for s in statements if s.lstrip().upper().startswith('INSERT')]
+    with engine.connect() as connection:
+        # Parameters only change the plan's constants, so placeholders bound to NULL explain the same plan
+        plan = [row[3] for row in connection.exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + recompute, (None,) * recompute.count('?'))]
+    assert not [step for step in plan if step.startswith('SCAN monthly_attendance')
+                or step.startswith('SCAN employee')], plan
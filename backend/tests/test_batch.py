@@ -0,0 +1,32 @@
+from sqlalchemy.orm import Session as OrmSession
+from models import Vendor
+from conftest import seed_masters
+
+EMPLOYEE = {
+    'emp_id': 'E00001', 'name': 'Eve', 'gender': 'Female', 'state': 'NY', 'location': 'NYC',
+    'vendor_name': 'Acme Corp', 'approver_emp_id': 'A001', 'billing_rule_id': 'BR1', 'designation_id': 1,
+    'dob': '1990-01-01', 'doj': '2023-01-01',
+}
+
+
+def batch(client, headers, *operations):
+    return client.post('/api/batch', headers=headers, json={'operations': list(operations)})
+
+
+def test_create_reports_unknown_reference_against_its_operation(client, engine, admin_headers):
+    seed_masters(engine)
+    response = batch(client, admin_headers,
+                     {'op': 'create', 'table': 'vendors', 'data': {'vendor_name': 'Initech'}},
+                     {'op': 'create', 'table': 'employees', 'data': {**EMPLOYEE, 'approver_emp_id': 'A999'}})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "approver_emp_id: 'A999' does not exist", 'index': 1}
+    with OrmSession(engine) as session:
+        assert session.get(Vendor, 'Initech') is None
+
+
+def test_create_sees_keys_created_earlier_in_the_batch(client, engine, admin_headers):
+    seed_masters(engine)
+    response = batch(client, admin_headers,
+                     {'op': 'create', 'table': 'vendors', 'data': {'vendor_name': 'Initech'}},
+                     {'op': 'create', 'table': 'employees', 'data': {**EMPLOYEE, 'vendor_name': 'Initech'}})
+    assert response.status_code == 200
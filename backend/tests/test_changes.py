@@ -0,0 +1,34 @@
+import pytest
+from conftest import seed_masters, seed_employees
+
+
+def changes(client, headers, **args):
+    response = client.get('/api/monthly-attendance/changes', headers=headers, query_string=args)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.mark.parametrize('via_batch', [False, True])
+def test_vendor_change_tombstones_rows_for_filtered_clients(client, engine, admin_headers, via_batch):
+    from app import employee_directory
+    seed_masters(engine)
+    seed_employees(engine, 1, 1)
+    employee_directory.rebuild()
+    client.post('/api/monthly-attendance', headers=admin_headers, json={'records': [
+        {'emp_id': 'E00001', 'year': 2024, 'month': 3, 'payable_days': 20, 'leaves_taken': 1},
+    ]})
+    snapshot = changes(client, admin_headers, vendor_name='Acme Corp')
+    [row] = snapshot['upserted']
+
+    data = {'vendor_name': 'Globex Inc', 'designation_id': 2}
+    if via_batch:
+        client.post('/api/batch', headers=admin_headers, json={'operations': [
+            {'op': 'update', 'table': 'employees', 'key': 'E00001', 'data': data},
+        ]})
+    else:
+        client.put('/api/employees/E00001', headers=admin_headers, json=data)
+
+    acme = changes(client, admin_headers, vendor_name='Acme Corp', since=snapshot['next'])
+    assert acme['deleted'] == [row['id']] and acme['upserted'] == []
+    globex = changes(client, admin_headers, vendor_name='Globex Inc', since=snapshot['next'])
+    assert [r['id'] for r in globex['upserted']] == [row['id']]
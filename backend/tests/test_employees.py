@@ -0,0 +1,59 @@
+import pytest
+from conftest import bearer, count_statements, seed_masters, seed_employees
+
+
+def list_from_database(client, engine, headers):
+    """GET /api/employees past the employee directory; returns (body, statements)."""
+    client.set_cookie('read_primary', '1')
+    with count_statements(engine) as statements:
+        response = client.get('/api/employees', headers=headers)
+        body = response.get_json()
+    assert response.status_code == 200
+    return body, len(statements)
+
+
+@pytest.mark.parametrize('username, is_admin', [('admin', True), ('A001', False)])
+def test_listing_statement_count_does_not_grow_with_rows(client, engine, username, is_admin):
+    headers = bearer(username, is_admin)
+    seed_masters(engine)
+    seed_employees(engine, 1, 4)
+    small, small_statements = list_from_database(client, engine, headers)
+    seed_employees(engine, 5, 60)
+    large, large_statements = list_from_database(client, engine, headers)
+
+    assert len(large) == (64 if is_admin else 32) > len(small)
+    assert large[0]['designation'] == 'Engineer' and large[0]['billing_rule_start_day'] == 1
+    assert large_statements == small_statements == 1
+
+
+def test_directory_listing_matches_database(client, engine, admin_headers):
+    from app import employee_directory
+    seed_masters(engine)
+    seed_employees(engine, 1, 10)
+    employee_directory.rebuild()
+    from_directory = client.get('/api/employees', headers=admin_headers).get_json()
+    from_database, _ = list_from_database(client, engine, admin_headers)
+    assert from_directory == from_database
+
+
+def test_writes_pin_reads_for_at_least_the_directory_refresh_interval(client, engine, admin_headers):
+    from employee_directory import DIRECTORY_REFRESH_SECONDS
+    seed_masters(engine)
+    seed_employees(engine, 1, 1)
+    response = client.put('/api/employees/E00001', headers=admin_headers, json={'name': 'Renamed'})
+    cookie = response.headers['Set-Cookie']
+    assert cookie.startswith('read_primary=1;')
+    max_age = int(cookie.split('Max-Age=')[1].split(';')[0])
+    assert max_age >= DIRECTORY_REFRESH_SECONDS
+
+
+def test_outdated_directory_is_bypassed(client, engine, admin_headers, monkeypatch):
+    from app import employee_directory
+    seed_masters(engine)
+    seed_employees(engine, 1, 1)
+    employee_directory.rebuild()
+    seed_employees(engine, 2, 1)
+    assert len(client.get('/api/employees', headers=admin_headers).get_json()) == 1
+    # Past the refresh interval (say the refresh is still running) the listing reads the database
+    monkeypatch.setattr(employee_directory, '_snapshot_at', employee_directory._snapshot_at - 3600)
+    assert len(client.get('/api/employees', headers=admin_headers).get_json()) == 2
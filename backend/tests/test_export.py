@@ -0,0 +1,12 @@
+from conftest import bearer
+
+
+def test_export_filename_uses_only_parsed_period(client, engine):
+    headers = bearer('admin', True)
+    response = client.get('/api/monthly-attendance/export?year=2024&month=3', headers=headers)
+    response.get_data()
+    assert response.headers['Content-Disposition'] == 'attachment; filename="monthly-attendance-2024-03.csv"'
+
+    response = client.get('/api/monthly-attendance/export?year=2024"%0d%0aX:1&month=../x', headers=headers)
+    response.get_data()
+    assert response.headers['Content-Disposition'] == 'attachment; filename="monthly-attendance.csv"'
@@ -0,0 +1,22 @@
+import threading
+
+
+def test_failed_warm_up_is_retried_without_raising(client, monkeypatch):
+    import app as app_module
+    attempts = []
+    retried = threading.Event()
+
+    def flaky_warm_up():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('database unavailable')
+        retried.set()
+
+    monkeypatch.setattr(app_module, 'warm_up', flaky_warm_up)
+    monkeypatch.setattr(app_module, 'WARM_UP_RETRY_SECONDS', 0.01)
+    app_module.warmed_up.clear()
+
+    app_module.warm_up_with_retry()
+    assert client.get('/readyz').status_code == 503
+    assert retried.wait(5)
+    assert len(attempts) == 2
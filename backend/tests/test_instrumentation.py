@@ -0,0 +1,29 @@
+from conftest import seed_masters, seed_employees
+
+
+def statement_total(route):
+    from instrumentation import REQUEST_STATEMENTS
+    counts, total = REQUEST_STATEMENTS._series.get(('GET', route), ([0], 0.0))
+    return counts[-1], total
+
+
+def test_streamed_response_is_recorded_after_its_body(client, engine, admin_headers):
+    seed_masters(engine)
+    seed_employees(engine, 1, 3)
+    client.set_cookie('read_primary', '1')
+    before = statement_total('/api/employees')
+
+    response = client.get('/api/employees', headers=admin_headers)
+    assert response.is_streamed
+    assert statement_total('/api/employees') == before
+    assert len(response.get_json()) == 3
+    response.close()
+
+    # The listing's single SELECT runs inside the streamed body
+    assert statement_total('/api/employees') == (before[0] + 1, before[1] + 1)
+
+
+def test_metrics_refuse_proxied_loopback_requests(client):
+    assert client.get('/internal/metrics').status_code == 200
+    assert client.get('/internal/metrics', headers={'X-Forwarded-For': '203.0.113.9'}).status_code == 403
+    assert client.get('/internal/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code == 403
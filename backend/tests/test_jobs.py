@@ -0,0 +1,38 @@
+import datetime
+from sqlalchemy.orm import Session as OrmSession
+from models import Job
+
+
+def add_running_job(engine, job_id, attempts, max_attempts, started_at):
+    with OrmSession(engine) as session:
+        session.add(Job(id=job_id, kind='import', status='running', payload={}, attempts=attempts,
+                        max_attempts=max_attempts, created_at=started_at, run_after=started_at,
+                        started_at=started_at, locked_by='worker'))
+        session.commit()
+
+
+def test_requeue_stale_fails_jobs_without_attempts_left(engine):
+    from jobs import requeue_stale, job_status, JOB_TIMEOUT
+    long_ago = datetime.datetime.utcnow() - datetime.timedelta(seconds=JOB_TIMEOUT + 60)
+    add_running_job(engine, 'last-attempt', 1, 1, long_ago)
+    add_running_job(engine, 'can-retry', 1, 3, long_ago)
+    add_running_job(engine, 'still-running', 1, 1, datetime.datetime.utcnow())
+
+    requeue_stale()
+
+    assert job_status('last-attempt')['status'] == 'failed'
+    assert job_status('can-retry')['status'] == 'queued'
+    assert job_status('still-running')['status'] == 'running'
+
+
+def test_cache_generation_bump_expires_master_cache(engine):
+    from app import generation_watch, bump_cache_generation, master_cache
+    generation_watch.poll()
+    version = master_cache.version('vendors')
+    generation_watch.poll()
+    assert master_cache.version('vendors') == version
+
+    with engine.begin() as connection:
+        bump_cache_generation(connection)
+    generation_watch.poll()
+    assert master_cache.version('vendors') == version + 1
@@ -0,0 +1,49 @@
+from sqlalchemy import update
+from models import Employee
+from conftest import seed_masters, seed_employees
+
+
+def test_submission_uses_current_employee_not_a_stale_directory(client, engine, admin_headers):
+    from app import employee_directory
+    seed_masters(engine)
+    seed_employees(engine, 1, 1)
+    employee_directory.rebuild()
+    # Another worker moves the employee; this process's directory has not refreshed yet
+    with engine.begin() as connection:
+        connection.execute(update(Employee).where(Employee.emp_id == 'E00001')
+                           .values(approver_emp_id='A002', vendor_name='Globex Inc', designation_id=2))
+    assert employee_directory.get('E00001').approver_emp_id == 'A001'
+
+    result = client.post('/api/monthly-attendance', headers=admin_headers, json={'records': [
+        {'emp_id': 'E00001', 'year': 2024, 'month': 3, 'payable_days': 20, 'leaves_taken': 1},
+    ]}).get_json()
+    assert result['accepted'] == 1
+
+    client.set_cookie('read_primary', '1')
+    [row] = client.get('/api/monthly-attendance', headers=admin_headers).get_json()
+    assert row['approver_emp_id'] == 'A002'
+    [group] = client.get('/api/attendance-summary', headers=admin_headers).get_json()
+    assert (group['vendor_name'], group['designation_id'], group['approver_emp_id']) == ('Globex Inc', 2, 'A002')
+
+
+def test_invalid_records_are_rejected_without_failing_the_submission(client, engine, admin_headers):
+    seed_masters(engine)
+    seed_employees(engine, 1, 1)
+    record = {'emp_id': 'E00001', 'year': 2024, 'month': 3, 'payable_days': 20, 'leaves_taken': 1}
+    result = client.post('/api/monthly-attendance', headers=admin_headers, json={'records': [
+        {**record, 'payable_days': None},
+        {**record, 'leaves_taken': -1},
+        {**record, 'payable_days': 40},
+        {**record, 'approver_emp_id': 'NOPE'},
+        {**record, 'approver_emp_id': 'A002', 'month': 4},
+    ]})
+    assert result.status_code == 200
+    body = result.get_json()
+    assert [r.get('reason') for r in body['results']] == [
+        'payable_days must be a whole number between 0 and 31',
+        'leaves_taken must be a whole number between 0 and 31',
+        'payable_days must be a whole number between 0 and 31',
+        'Approver not found',
+        None,
+    ]
+    assert body['accepted'] == 1 and body['results'][4]['status'] == 'accepted'
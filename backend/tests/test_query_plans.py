@@ -0,0 +1,25 @@
+import os
+import pytest
+from check_query_plans import UNSELECTIVE, all_cases, plan_problem, plan_session
+
+# A fresh in-memory SQLite schema by default; point it at a scratch Postgres database to check those plans
+QUERY_PLAN_DATABASE_URL = os.getenv('QUERY_PLAN_DATABASE_URL', 'sqlite://')
+
+CASES = list(all_cases())
+
+
+@pytest.fixture(scope='module')
+def session():
+    session = plan_session(QUERY_PLAN_DATABASE_URL)
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize('endpoint, combo, build', CASES,
+                         ids=[f'{endpoint}[{",".join(combo)}]' for endpoint, combo, _ in CASES])
+def test_filter_combination_uses_an_index(session, endpoint, combo, build):
+    assert plan_problem(session, endpoint, combo, build) is None
+
+
+def test_unselective_combinations_are_checked_cases():
+    assert set(UNSELECTIVE) <= {(endpoint, combo) for endpoint, combo, _ in CASES}
@@ -0,0 +1,39 @@
+# worker.py
+"""
+Background job worker pool.
+Runs the handlers registered in app.py against the jobs table, one job at a
+time per process.
+Usage: python worker.py [processes]
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+
+def run(stop):
+    import app  # noqa: F401  (registers the job handlers)
+    from db import engine
+    from jobs import work
+    # Never reuse connections inherited from the parent process
+    engine.dispose(close=False)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(f'{socket.gethostname()}:{os.getpid()}', stop)
+
+
+if __name__ == '__main__':
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv('JOB_WORKERS', str(os.cpu_count() or 1)))
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    workers = [multiprocessing.Process(target=run, args=(stop,), daemon=True) for _ in range(processes)]
+    for process in workers:
+        process.start()
+    print(f'Started {processes} job worker(s).')
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for process in workers:
+            process.join()
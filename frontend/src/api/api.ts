@@ -8,6 +8,8 @@ let jwtToken: string | null = localStorage.getItem('jwtToken');
 // Axios instance
 export const api = axios.create({
   baseURL: BASE_URL,
+  // Sends the backend's read_primary cookie, which routes reads after a write to the primary
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
     ...(jwtToken ? { Authorization: `Bearer ${jwtToken}` } : {}),
@@ -61,11 +63,18 @@ export const deleteData = async (endpoint: string, id: string | number) => {
   return response.data;
 };
 
+// List endpoints answer format=columnar with {columns, rows}, which skips repeating
+// every key per row; expand it back into objects for the tables
+export const fetchList = async (url: string, params: Record<string, any> = {}) => {
+  const response = await api.get(url, { params: { ...params, format: 'columnar' } });
+  const { columns, rows } = response.data as { columns: string[]; rows: any[][] };
+  return rows.map((row) => Object.fromEntries(columns.map((column, i) => [column, row[i]])));
+};
+
 // Fetch APIs
 export const fetchEmployees = async () => {
   try {
-    const response = await api.get('/api/employees');
-    return response.data;
+    return await fetchList('/api/employees');
   } catch (error) {
     console.error('Error fetching employees:', error);
     return [];
@@ -1,9 +1,18 @@
-import { api } from './api';
+import { api, fetchList } from './api';
 
 export const fetchAttendanceRecords = async (filters: any) => {
     const params = Object.fromEntries(
         Object.entries(filters).filter(([_, v]) => v !== '' && v !== undefined)
     );
-    const response = await api.get('/api/monthly-attendance', { params });
-    return response.data;
+    return fetchList('/api/monthly-attendance', params);
+};
+
+// Delta sync: omit `since` for a full snapshot, then pass back the returned `next` token
+export const fetchAttendanceChanges = async (filters: any, since?: string) => {
+    const params = Object.fromEntries(
+        Object.entries(filters).filter(([_, v]) => v !== '' && v !== undefined)
+    );
+    if (since) params.since = since;
+    const response = await api.get('/api/monthly-attendance/changes', { params });
+    return response.data as { next: string; deleted: number[]; upserted: any[] };
 };
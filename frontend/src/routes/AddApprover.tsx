@@ -5,7 +5,6 @@ import { useAuthTokenSync } from '../api/auth';
 import { motion } from 'framer-motion';
 import { ToastContainer, toast } from 'react-toastify';
 import 'react-toastify/dist/ReactToastify.css';
-import bcrypt from 'bcryptjs';
 
 // Define types for form and payload
 interface FormState {
@@ -26,7 +25,7 @@ interface Payload {
     manager_emp_id: string;
     manager_name: string;
     manager_email: string;
-    password_hash: string;
+    password: string;
 }
 
 export default function AddApprover() {
@@ -141,7 +140,8 @@ export default function AddApprover() {
             manager_emp_id: form.manager_emp_id,
             manager_name: form.manager_name,
             manager_email: form.manager_email,
-            password_hash: bcrypt.hashSync(form.password, bcrypt.genSaltSync(10))
+            // Hashed server-side; an empty password on edit keeps the current one
+            password: form.password
         };
         try {
             if (editMode && editEmpId !== null) {
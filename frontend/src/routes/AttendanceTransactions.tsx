@@ -1,8 +1,8 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { motion } from 'framer-motion';
 import { ToastContainer, toast } from 'react-toastify';
 import 'react-toastify/dist/ReactToastify.css';
-import { api } from '../api/api';
+import { fetchAttendanceChanges } from '../api/attendance';
 import AttendanceNavbar from '../components/AttendanceNavbar';
 import RequireAuth from '../components/RequireAuth';
 
@@ -32,18 +32,21 @@ function AttendanceTransactionsContent() {
         resigned: '',
     });
 
+    // Filters and token of the loaded snapshot; polling asks only for what changed since
+    const sync = useRef<{ filters: typeof filters; next: string } | null>(null);
+
     useEffect(() => {
         fetchRecords();
+        const timer = setInterval(pollChanges, 60000);
+        return () => clearInterval(timer);
     }, []);
 
     const fetchRecords = async () => {
         setLoading(true);
         try {
-            const params = Object.fromEntries(
-                Object.entries(filters).filter(([_, v]) => v !== '' && v !== undefined)
-            );
-            const response = await api.get('/api/monthly-attendance', { params });
-            setRecords(response.data);
+            const snapshot = await fetchAttendanceChanges(filters);
+            sync.current = { filters, next: snapshot.next };
+            setRecords(snapshot.upserted);
         } catch (err) {
             toast.error('Failed to fetch attendance records');
         } finally {
@@ -51,6 +54,23 @@ function AttendanceTransactionsContent() {
         }
     };
 
+    const pollChanges = async () => {
+        if (!sync.current) return;
+        try {
+            const delta = await fetchAttendanceChanges(sync.current.filters, sync.current.next);
+            sync.current = { ...sync.current, next: delta.next };
+            if (!delta.deleted.length && !delta.upserted.length) return;
+            setRecords((prev) => {
+                const byId = new Map(prev.map((r) => [r.id, r]));
+                delta.deleted.forEach((id) => byId.delete(id));
+                delta.upserted.forEach((r) => byId.set(r.id, r));
+                return [...byId.values()].sort((a, b) => a.id - b.id);
+            });
+        } catch (err) {
+            // Keep showing the last snapshot; the next poll retries
+        }
+    };
+
     const handleFilterChange = (field: string, value: string) => {
         setFilters((prev) => ({ ...prev, [field]: value }));
     };